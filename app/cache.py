@@ -0,0 +1,234 @@
+# app/cache.py - In-process and shared caching helpers
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# redis is optional, only needed by the redis summary cache backend
+try:
+    import redis
+except ImportError:
+    redis = None
+
+class TTLCache:
+    """
+    Thread-safe in-process cache where entries expire after `ttl` seconds.
+    Once `maxsize` entries are stored the least recently used one is evicted.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entry if full"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove a single entry if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Return the hit/miss counters and current size"""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
+
+    def __len__(self):
+        return len(self._data)
+
+class MemoryBackend:
+    """
+    Result cache kept in the worker process, entries are stored as strings
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self._cache = TTLCache(maxsize, ttl)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+    def stats(self):
+        return self._cache.stats()
+
+class FileSystemBackend:
+    """
+    Result cache shared by all workers on a host, one file per entry.
+    Entries expire `ttl` seconds after being written, and once the directory
+    grows past `max_bytes` the least recently written entries are removed.
+    Every worker measures the directory again after writing a twentieth of
+    `max_bytes`, so with N workers it can exceed the limit by N twentieths
+    at most before one of them evicts.
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, ttl=300):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+        # Estimated directory size, measured on start and whenever this process
+        # has written scan_bytes since, other workers write to it as well
+        self._size = self._directory_size()
+        self._unscanned = 0
+        self._scan_bytes = max_bytes // 20
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def _entries(self):
+        """Return (mtime, size, path) of every entry"""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.is_file() and not entry.name.startswith('.'):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _directory_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl < time.time():
+                os.remove(path)
+                raise FileNotFoundError(path)
+            with open(path, 'rb') as f:
+                value = f.read().decode('utf-8')
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        data = value.encode('utf-8')
+
+        # Write to a temporary file first so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, self._path(key))
+
+        with self._lock:
+            self._size += len(data)
+            self._unscanned += len(data)
+            if self._size > self.max_bytes or self._unscanned >= self._scan_bytes:
+                self._size = self._directory_size()
+                self._unscanned = 0
+                if self._size > self.max_bytes:
+                    self._evict()
+
+    def _evict(self):
+        """Remove the oldest entries until the directory is under 90% of max_bytes"""
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        self._size = size
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries())}
+
+class RedisBackend:
+    """
+    Result cache shared by all workers through a Redis server.
+    Entries expire after `ttl` seconds. Size is bounded by the server, which
+    should run with maxmemory and an allkeys-lru eviction policy.
+    """
+
+    def __init__(self, url, ttl=300, prefix='expenses:'):
+        if redis is None:
+            raise RuntimeError('SUMMARY_CACHE_BACKEND is redis but redis is not installed')
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value.decode('utf-8')
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value.encode('utf-8'), ex=self.ttl)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': None}
+
+def make_result_cache(config):
+    """
+    Create the summary result cache chosen by SUMMARY_CACHE_BACKEND:
+    memory, filesystem, redis or none (returns None)
+    """
+    backend = config.get('SUMMARY_CACHE_BACKEND', 'memory')
+    ttl = config.get('SUMMARY_CACHE_TTL', 300)
+
+    if backend == 'none':
+        return None
+    if backend == 'memory':
+        return MemoryBackend(config.get('SUMMARY_CACHE_SIZE', 1024), ttl)
+    if backend == 'filesystem':
+        directory = config.get('SUMMARY_CACHE_DIR') or \
+            os.path.join(tempfile.gettempdir(), 'expense-summary-cache')
+        return FileSystemBackend(directory, config.get('SUMMARY_CACHE_MAX_BYTES', 64 * 1024 * 1024), ttl)
+    if backend == 'redis':
+        return RedisBackend(config.get('SUMMARY_CACHE_REDIS_URL', 'redis://localhost:6379/0'), ttl)
+
+    raise ValueError(f'Unknown SUMMARY_CACHE_BACKEND: {backend}')
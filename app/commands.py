@@ -0,0 +1,62 @@
+# app/commands.py - Flask CLI commands
+import click
+from flask.cli import AppGroup
+from app.database import get_db
+from app.indexes import ensure_indexes, missing_indexes
+from app.models.ExpenseRollupHandler import ExpenseRollupHandler
+
+# Commands for the pre-aggregated expense rollups
+rollups_cli = AppGroup('rollups', help='Manage the pre-aggregated expense rollups.')
+
+@rollups_cli.command('rebuild')
+@click.option('--user-id', default=None, help='Only rebuild the rollups of this user.')
+def rebuild_rollups(user_id):
+    """Recompute the expense rollups and category expense counts from the expenses collection."""
+    count = ExpenseRollupHandler().rebuild(user_id)
+    click.echo(f'Wrote {count} rollup documents')
+
+# Commands for database maintenance
+db_cli = AppGroup('db', help='Manage the database indexes and inspect the connection.')
+
+@db_cli.command('ensure-indexes')
+def ensure_indexes_command():
+    """Create any registered index that doesn't exist yet."""
+    names = ensure_indexes(get_db().db)
+    click.echo(f'Ensured {len(names)} indexes')
+
+@db_cli.command('check-indexes')
+def check_indexes_command():
+    """List registered indexes missing from the database, exit 1 if any."""
+    missing = missing_indexes(get_db().db)
+    for collection_name, index_name in missing:
+        click.echo(f'Missing index {index_name} on {collection_name}')
+    if missing:
+        raise SystemExit(1)
+    click.echo('All indexes present')
+
+def _milliseconds(seconds):
+    return None if seconds is None else int(seconds * 1000)
+
+@db_cli.command('pool-settings')
+def pool_settings_command():
+    """Show the connection pool settings the MongoDB client is actually using."""
+    options = get_db().cx.options
+    pool = options.pool_options
+    settings = {
+        'maxPoolSize': pool.max_pool_size,
+        'minPoolSize': pool.min_pool_size,
+        'maxIdleTimeMS': _milliseconds(pool.max_idle_time_seconds),
+        'waitQueueTimeoutMS': _milliseconds(pool.wait_queue_timeout),
+        'connectTimeoutMS': _milliseconds(pool.connect_timeout),
+        'socketTimeoutMS': _milliseconds(pool.socket_timeout),
+        'serverSelectionTimeoutMS': _milliseconds(options.server_selection_timeout),
+        'retryReads': options.retry_reads,
+        'retryWrites': options.retry_writes,
+    }
+    for name, value in settings.items():
+        click.echo(f'{name}: {value}')
+
+def register_commands(app):
+    """Register the CLI command groups with the app"""
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(db_cli)
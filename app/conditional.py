@@ -0,0 +1,61 @@
+# app/conditional.py - Conditional GET support driven by the per-user data version
+import hashlib
+from functools import wraps
+from bson.errors import InvalidId
+from flask import current_app, request
+from app.repositories import get_data_version_handler
+
+def make_etag(endpoint, user_id, version, args, *parts):
+    """
+    Build a strong ETag from an endpoint name, the user's data version, the
+    (name, value) pairs of the query string and any extra parts.
+    The async routes use the same endpoint names so both tiers agree on ETags.
+    """
+    key = '|'.join([
+        endpoint,
+        str(user_id),
+        str(version),
+        '&'.join(f'{name}={value}' for name, value in sorted(args)),
+        *(str(part) for part in parts)
+    ])
+    return f'{version}-{hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]}'
+
+def data_version_etag(user_id, *parts):
+    """
+    Build a strong ETag for the current request from the user's data version,
+    the endpoint, its query parameters and any extra parts
+    """
+    version = get_data_version_handler().get(user_id)
+    return make_etag(request.endpoint, user_id, version, request.args.items(multi=True), *parts)
+
+def etag_by_data_version(*extra_parts):
+    """
+    Decorator for GET routes taking a user_id whose response only depends on
+    that user's expenses and categories. The response gets an ETag derived
+    from the user's data version, and a matching If-None-Match is answered
+    with 304 without calling the route at all.
+    extra_parts are callables whose results are added to the ETag, for
+    responses that also depend on something else, like the current date.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(user_id, **kwargs):
+            try:
+                etag = data_version_etag(user_id, *(part() for part in extra_parts))
+            except InvalidId:
+                # Let the route report the invalid id
+                return view(user_id, **kwargs)
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(user_id, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            # Clients may keep the response but must revalidate it every time
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -1,9 +1,14 @@
 # app/database.py - Database connection management
 from flask_pymongo import PyMongo
+from pymongo import AsyncMongoClient
+from app.monitoring import event_listeners
 
 # MongoDB instance
 mongo = None
 
+# Client of the async API tier, see asgi.py
+async_client = None
+
 def get_db():
     """
     Returns the MongoDB client instance.
@@ -14,11 +19,71 @@ def get_db():
         raise RuntimeError("Database not initialized. Call init_db first.")
     return mongo
 
+def client_options(config, client='sync'):
+    """
+    MongoClient keyword arguments from the MONGO_* settings.
+    Flask-PyMongo only reads MONGO_URI, so everything else is passed explicitly.
+    client names the client in the pool metrics.
+    """
+    return {
+        'connect': config.get('MONGO_CONNECT', False),
+        'maxPoolSize': config.get('MONGO_MAXPOOLSIZE', 100),
+        'minPoolSize': config.get('MONGO_MINPOOLSIZE', 0),
+        'maxIdleTimeMS': config.get('MONGO_MAX_IDLE_TIME_MS'),
+        'waitQueueTimeoutMS': config.get('MONGO_WAIT_QUEUE_TIMEOUT_MS'),
+        'serverSelectionTimeoutMS': config.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 30000),
+        'connectTimeoutMS': config.get('MONGO_CONNECT_TIMEOUT_MS', 20000),
+        'socketTimeoutMS': config.get('MONGO_SOCKET_TIMEOUT_MS'),
+        'retryReads': config.get('MONGO_RETRYREADS', True),
+        'retryWrites': config.get('MONGO_RETRYWRITES', True),
+        'event_listeners': event_listeners(client),
+    }
+
 def init_db(app):
     """
     Initialize the MongoDB connection with the given Flask app.
     Returns the MongoDB client instance.
+    Commands and pool checkouts are timed by the listeners in app/monitoring.py
     """
     global mongo
-    mongo = PyMongo(app)
-    return mongo
\ No newline at end of file
+    mongo = PyMongo(app, **client_options(app.config))
+    return mongo
+
+def close_db():
+    """
+    Close the client's connections, done in a preforking server's master
+    before forking so workers never share its sockets
+    """
+    if mongo is not None:
+        mongo.cx.close()
+
+def reconnect_db(app):
+    """
+    Replace the client with a new one, done in each worker after fork.
+    Repositories resolve the database on every use so they pick it up.
+    """
+    mongo.init_app(app, **client_options(app.config))
+    return mongo
+
+def init_async_db(app):
+    """
+    Create the AsyncMongoClient used by the async handlers, with the same
+    pool settings and listeners as the sync client.
+    Has to be called from the event loop that will use it.
+    """
+    global async_client
+    async_client = AsyncMongoClient(app.config['MONGO_URI'], **client_options(app.config, 'async'))
+    return async_client
+
+def get_async_db():
+    """Returns the database of the async client"""
+    if async_client is None:
+        raise RuntimeError("Async database not initialized. Call init_async_db first.")
+    return async_client.get_default_database()
+
+async def close_async_db():
+    """Close the async client's connections"""
+    global async_client
+    if async_client is not None:
+        await async_client.close()
+        async_client = None
@@ -0,0 +1,100 @@
+# app/indexes.py - Declarative index registry for all collections
+from pymongo import IndexModel
+from app.models.ExpenseHandler import ExpenseHandler
+from app.models.CategoryHandler import CategoryHandler
+from app.models.UserHandler import UserRepository
+
+def sort_indexes(fields, prefix=()):
+    """
+    Indexes backing each sortable field, ordered as (prefix..., field, _id) so a
+    sorted list query is served by an index scan in either direction
+    """
+    return [IndexModel([(key, 1) for key in prefix] + [(field, 1), ('_id', 1)])
+            for field in fields]
+
+# Indexes every collection needs, by collection name
+INDEXES = {
+    'expenses': [
+        # Index by user_id for faster querying of a user's expenses
+        IndexModel([('user_id', 1)]),
+        # Index by category_id for faster category filtering
+        IndexModel([('category_id', 1)]),
+        # Compound index for date-based queries per user
+        IndexModel([('user_id', 1), ('date', -1)]),
+        # Same ordering with _id as tie-breaker so cursor pagination can seek on it
+        IndexModel([('user_id', 1), ('date', -1), ('_id', -1)]),
+        # Sorted listings of a user's expenses, date is covered above
+        *sort_indexes([field for field in ExpenseHandler.SORT_FIELDS if field != 'date'],
+                      prefix=('user_id',)),
+    ],
+    'categories': [
+        # Compound index to ensure name uniqueness per user
+        IndexModel([('name', 1), ('user_id', 1)], unique=True),
+        # Index by user_id for faster querying
+        IndexModel([('user_id', 1)]),
+        # Sorted listings of a user's categories and of all categories
+        *sort_indexes(CategoryHandler.SORT_FIELDS, prefix=('user_id',)),
+        *sort_indexes(CategoryHandler.SORT_FIELDS),
+    ],
+    'users': [
+        # Username and email should be unique
+        IndexModel([('username', 1)], unique=True),
+        IndexModel([('email', 1)], unique=True),
+        # Sorted listings of all users
+        *sort_indexes(UserRepository.SORT_FIELDS),
+    ],
+    'expense_rollups': [
+        # One rollup document per user, month, category and payment method
+        IndexModel([('user_id', 1), ('period', 1), ('category_id', 1), ('payment_method', 1)],
+                   unique=True),
+        # Rollups of a category, moved when the category is merged into another
+        IndexModel([('category_id', 1)]),
+    ],
+    'category_usage': [
+        # Expense counts of a user's categories, replaced when their rollups are rebuilt
+        IndexModel([('user_id', 1)]),
+    ],
+}
+
+def _key(index_spec):
+    """Normalize an index key specification for comparison"""
+    return tuple((field, int(direction)) for field, direction in index_spec.items())
+
+def ensure_indexes(db):
+    """
+    Create all registered indexes, one createIndexes command per collection
+    Returns the names of the indexes, existing ones included
+    """
+    names = []
+    for collection_name, indexes in INDEXES.items():
+        names += db[collection_name].create_indexes(indexes)
+    return names
+
+def missing_indexes(db):
+    """
+    Compare the registry against the database, one listIndexes command per collection
+    Returns a list of (collection name, index name) that don't exist yet
+    """
+    missing = []
+    for collection_name, indexes in INDEXES.items():
+        existing = {_key(index['key']) for index in db[collection_name].list_indexes()}
+        for index in indexes:
+            if _key(index.document['key']) not in existing:
+                missing.append((collection_name, index.document['name']))
+    return missing
+
+def init_indexes(app, db):
+    """
+    Handle indexes at startup according to MONGO_INDEX_MODE:
+    - ensure: create any missing index
+    - check: only log the indexes that are missing
+    - off: do nothing, use `flask db ensure-indexes` at deploy time
+    """
+    mode = app.config.get('MONGO_INDEX_MODE', 'check')
+
+    if mode == 'ensure':
+        ensure_indexes(db)
+    elif mode == 'check':
+        for collection_name, index_name in missing_indexes(db):
+            app.logger.warning('Missing index %s on %s, run `flask db ensure-indexes`',
+                               index_name, collection_name)
@@ -0,0 +1,56 @@
+# models/AsyncCategoryHandler.py
+from app.database import get_async_db
+from app.models.AsyncDataVersionHandler import AsyncDataVersionHandler
+from app.models.CategoryHandler import CategoryHandler
+from app.pagination import count_documents_async, sort_spec
+from bson import ObjectId
+
+class AsyncCategoryHandler:
+    """
+    Async counterpart of CategoryHandler's read methods, used by the async API tier.
+    Shares the process' category lookup cache with the sync handlers, so
+    their writes clear it for both.
+    """
+
+    SORT_FIELDS = CategoryHandler.SORT_FIELDS
+
+    @property
+    def db(self):
+        return get_async_db()
+
+    @property
+    def collection(self):
+        return self.db.categories
+
+    def __init__(self, category_handler):
+        self.cache = category_handler.cache
+        self.versions = AsyncDataVersionHandler()
+
+    async def find_by_user(self, user_id, skip=0, limit=100, sort_by='name', sort_dir=1, count='exact'):
+        """
+        Find all categories for a user with pagination, as plain dicts
+        Raises ValueError on an invalid count mode or sort
+        """
+        if isinstance(user_id, str):
+            user_id = ObjectId(user_id)
+
+        sort = sort_spec(sort_by, sort_dir, self.SORT_FIELDS)
+
+        # Same key as CategoryHandler.find_by_user
+        key = ('user', user_id, await self.versions.get(user_id), skip, limit, sort_by, sort_dir, count)
+        cached = self.cache.get(key)
+        if cached is None:
+            total_count = await count_documents_async(self.collection, {'user_id': user_id}, count)
+            cursor = self.collection.find({'user_id': user_id}).sort(sort).skip(skip).limit(limit)
+
+            cached = (await cursor.to_list(), total_count)
+            self.cache.set(key, cached)
+
+        category_docs, total_count = cached
+
+        return {
+            'categories': [dict(category_data) for category_data in category_docs],
+            'total': total_count,
+            'skip': skip,
+            'limit': limit
+        }
@@ -0,0 +1,25 @@
+# models/AsyncDataVersionHandler.py
+from app.database import get_async_db
+from bson import ObjectId
+
+class AsyncDataVersionHandler:
+    """
+    Read side of DataVersionHandler for the async API tier,
+    versions are only bumped by the sync handlers
+    """
+
+    @property
+    def db(self):
+        return get_async_db()
+
+    @property
+    def collection(self):
+        return self.db.data_versions
+
+    async def get(self, user_id):
+        """Return the current data version of a user, 0 if nothing was written yet"""
+        if isinstance(user_id, str):
+            user_id = ObjectId(user_id)
+
+        document = await self.collection.find_one({'_id': user_id}, {'version': 1})
+        return document['version'] if document else 0
@@ -0,0 +1,86 @@
+# models/AsyncExpenseHandler.py
+from app.database import get_async_db
+from app.models.AsyncDataVersionHandler import AsyncDataVersionHandler
+from app.models.ExpenseHandler import cached_summary
+from app.pagination import count_documents_async
+
+class AsyncExpenseHandler:
+    """
+    Async counterpart of ExpenseHandler's read methods, used by the async API tier.
+    Queries and pipelines are built by the sync handler so both tiers return
+    the same results, and summaries share its result cache.
+    Writes stay on the sync handlers.
+    """
+
+    @property
+    def db(self):
+        return get_async_db()
+
+    @property
+    def collection(self):
+        return self.db.expenses
+
+    def __init__(self, expense_handler):
+        self.planner = expense_handler
+        self.summary_cache = expense_handler.summary_cache
+        self.versions = AsyncDataVersionHandler()
+
+    async def find_by_user(self, user_id, skip=0, limit=50, sort_by='date', sort_dir=-1,
+                           start_date=None, end_date=None, category_id=None, after=None, count='exact',
+                           expand_category=False):
+        """
+        Find all expenses for a user with optional filtering and pagination, as plain dicts
+        Takes the same arguments as ExpenseHandler.find_by_user
+        Raises ValueError on an invalid cursor, count mode or sort
+        """
+        query, page_query, sort, skip, pipeline = self.planner.page_plan(
+            user_id, skip, limit, sort_by, sort_dir, start_date, end_date, category_id, after,
+            expand_category
+        )
+
+        total_count = await count_documents_async(self.collection, query, count)
+
+        if pipeline:
+            expense_docs = await (await self.collection.aggregate(pipeline)).to_list()
+        else:
+            cursor = self.collection.find(page_query).sort(sort).skip(skip).limit(limit)
+            expense_docs = await cursor.to_list()
+
+        return {
+            'expenses': expense_docs,
+            'total': total_count,
+            'skip': skip,
+            'limit': limit,
+            'next_cursor': self.planner.next_cursor(expense_docs, limit, sort_by, sort_dir)
+        }
+
+    async def _run_plan(self, plan):
+        """Run a (collection name, pipeline, formatter) plan built by the sync handler"""
+        collection_name, pipeline, formatter = plan
+        result = await (await self.db[collection_name].aggregate(pipeline)).to_list()
+        return formatter(result) if formatter else result
+
+    @cached_summary('category')
+    async def get_summary_by_category(self, user_id, start_date=None, end_date=None, expand_category=False):
+        """Get a summary of expenses grouped by category"""
+        return await self._run_plan(
+            self.planner.category_summary_plan(user_id, start_date, end_date, expand_category))
+
+    @cached_summary('month')
+    async def get_summary_by_month(self, user_id, year=None):
+        """Get a summary of expenses grouped by month for a specific year"""
+        return await self._run_plan(self.planner.month_summary_plan(user_id, year))
+
+    @cached_summary('payment_method')
+    async def get_summary_by_payment_method(self, user_id, start_date=None, end_date=None):
+        """Get a summary of expenses grouped by payment method"""
+        return await self._run_plan(
+            self.planner.payment_method_summary_plan(user_id, start_date, end_date))
+
+    async def get_dashboard_summary(self, user_id, start_date=None, end_date=None, year=None, limit=100):
+        """Get everything the dashboard needs in a single aggregation, expenses as plain dicts"""
+        pipeline = self.planner.dashboard_pipeline(user_id, start_date, end_date, year, limit)
+        result = await (await self.collection.aggregate(pipeline)).to_list()
+
+        # $facet always returns a single document
+        return self.planner.format_dashboard(result[0], raw=True)
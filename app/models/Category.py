@@ -1,12 +1,22 @@
 # models/Category.py
 from datetime import datetime
 from bson import ObjectId
+from types import MappingProxyType
+
+# Shared read-only `extra` for documents without additional fields
+NO_EXTRA = MappingProxyType({})
 
 class Category:
     """
     Category model for MongoDB
     """
     
+    # Slots keep per-instance memory down when materializing large pages,
+    # fields not listed here are kept in `extra`
+    __slots__ = ('_id', 'name', 'user_id', 'description', 'color', 'icon', 'created_at', 'extra')
+    
+    fields = frozenset(__slots__) - {'extra'}
+    
     required_fields = ['name', 'user_id']
     
     def __init__(self, name, user_id=None, description=None, color=None, icon=None, 
@@ -20,8 +30,35 @@ class Category:
         self.created_at = created_at or datetime.utcnow()
         
         # Add any additional fields from kwargs
-        for key, value in kwargs.items():
-            setattr(self, key, value)
+        self.extra = kwargs
+    
+    def __getattr__(self, name):
+        # Only called for names that aren't slots, look them up in the additional fields
+        try:
+            return object.__getattribute__(self, 'extra')[name]
+        except (AttributeError, KeyError):
+            raise AttributeError(f"'Category' object has no attribute '{name}'") from None
+    
+    @classmethod
+    def from_bson(cls, data):
+        """
+        Create a Category instance from a document read from MongoDB.
+        The document's types are trusted as stored, so no conversion or
+        validation is done. The document is not modified.
+        """
+        category = cls.__new__(cls)
+        category._id = data.get('_id')
+        category.name = data.get('name')
+        category.user_id = data.get('user_id')
+        category.description = data.get('description') or ""
+        category.color = data.get('color') or "#3498db"
+        category.icon = data.get('icon') or "tag"
+        category.created_at = data.get('created_at')
+        
+        # Keep any additional fields
+        extra_keys = data.keys() - cls.fields
+        category.extra = {key: data[key] for key in extra_keys} if extra_keys else NO_EXTRA
+        return category
     
     @classmethod
     def from_dict(cls, data):
@@ -59,11 +96,11 @@ class Category:
         }
         
         # Include user_id if it exists
-        if hasattr(self, 'user_id') and self.user_id is not None:
+        if self.user_id is not None:
             category_dict['user_id'] = self.user_id
         
         # Include any additional attributes that may have been added
-        for key, value in self.__dict__.items():
+        for key, value in self.extra.items():
             if key not in category_dict and not key.startswith('_'):
                 category_dict[key] = value
                 
@@ -1,55 +1,184 @@
 # models/CategoryHandler.py
 from app.database import get_db
 from app.models.Category import Category
+from app.models.DataVersionHandler import DataVersionHandler
+from app.models.ExpenseRollupHandler import ExpenseRollupHandler
+from app.cache import TTLCache
+from app.pagination import count_documents, sort_spec
 from bson import ObjectId
-from pymongo.errors import DuplicateKeyError, PyMongoError
+from flask import current_app
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+
+# Categories every new user starts with
+DEFAULT_CATEGORIES = [
+    {
+        'name': 'Food & Dining',
+        'description': 'Restaurants, groceries, and food delivery',
+        'color': '#FF5733',
+        'icon': 'restaurant'
+    },
+    {
+        'name': 'Transportation',
+        'description': 'Public transit, gas, and vehicle maintenance',
+        'color': '#3498DB',
+        'icon': 'directions_car'
+    },
+    {
+        'name': 'Housing',
+        'description': 'Rent, mortgage, and home maintenance',
+        'color': '#2ECC71',
+        'icon': 'home'
+    },
+    {
+        'name': 'Entertainment',
+        'description': 'Movies, concerts, and other entertainment',
+        'color': '#9B59B6',
+        'icon': 'movie'
+    },
+    {
+        'name': 'Shopping',
+        'description': 'Clothing, electronics, and other retail purchases',
+        'color': '#F39C12',
+        'icon': 'shopping_cart'
+    },
+    {
+        'name': 'Utilities',
+        'description': 'Electricity, water, internet, and phone bills',
+        'color': '#1ABC9C',
+        'icon': 'power'
+    },
+    {
+        'name': 'Healthcare',
+        'description': 'Medical appointments, medications, and insurance',
+        'color': '#E74C3C',
+        'icon': 'local_hospital'
+    },
+    {
+        'name': 'Travel',
+        'description': 'Flights, hotels, and vacation expenses',
+        'color': '#34495E',
+        'icon': 'flight'
+    },
+    {
+        'name': 'Personal Care',
+        'description': 'Haircuts, gym memberships, and personal care items',
+        'color': '#D35400',
+        'icon': 'spa'
+    },
+    {
+        'name': 'Other',
+        'description': 'Miscellaneous expenses',
+        'color': '#7F8C8D',
+        'icon': 'more_horiz'
+    }
+]
 
 class CategoryHandler:
     """
     Repository class for handling Category document operations in MongoDB
     """
     
+    # Fields categories can be sorted on, each backed by an index in app/indexes.py
+    SORT_FIELDS = ('name', 'created_at')
+    
+    # Lookup cache shared by all handlers in the process
+    _cache = None
+    
+    @property
+    def db(self):
+        return get_db().db
+    
+    @property
+    def collection(self):
+        return self.db.categories
+    
     def __init__(self):
-        self.db = get_db().db
-        self.collection = self.db.categories
+        if CategoryHandler._cache is None:
+            CategoryHandler._cache = TTLCache(
+                maxsize=current_app.config.get('CATEGORY_CACHE_SIZE', 1024),
+                ttl=current_app.config.get('CATEGORY_CACHE_TTL', 300)
+            )
+        self.cache = CategoryHandler._cache
         
-        # Ensure indexes for performance and constraints
-        self._ensure_indexes()
+        # Per-user data versions, bumped on every write
+        self.versions = DataVersionHandler()
     
-    def _ensure_indexes(self):
-        """Create necessary indexes for the categories collection"""
-        # Compound index to ensure name uniqueness per user
-        self.collection.create_index([('name', 1), ('user_id', 1)], unique=True)
-        # Index by user_id for faster querying
-        self.collection.create_index('user_id')
+    def cache_stats(self):
+        """Return the hit/miss counters of the category lookup cache"""
+        return self.cache.stats()
     
-    def find_by_id(self, category_id):
-        """Find a category by its ID"""
+    def find_by_id(self, category_id, raw=False):
+        """
+        Find a category by its ID
+        With raw=True the document is returned as a plain dict
+        """
         if isinstance(category_id, str):
             category_id = ObjectId(category_id)
+        
+        # The owner isn't known before the lookup, so the entry keeps the owner's
+        # data version it was read at and is only used while that is current,
+        # other workers' edits and deletes bump it
+        key = ('id', category_id)
+        category_data = None
+        cached = self.cache.get(key)
+        if cached is not None:
+            version, cached_data = cached
+            if version == self.versions.get(cached_data['user_id']):
+                category_data = cached_data
+        
+        if category_data is None:
+            category_data = self.collection.find_one({'_id': category_id})
+            # Categories without an owner have no data version to check against
+            if category_data and category_data.get('user_id'):
+                # Read again after the version, so a write in between bumps past the cached one
+                version = self.versions.get(category_data['user_id'])
+                category_data = self.collection.find_one({'_id': category_id})
+                if category_data:
+                    self.cache.set(key, (version, category_data))
             
-        category_data = self.collection.find_one({'_id': category_id})
         if category_data:
-            return Category.from_dict(category_data)
+            # Hand out a copy so the cached document is never modified
+            return dict(category_data) if raw else Category.from_bson(category_data)
         return None
     
-    def find_by_user(self, user_id, skip=0, limit=100, sort_by='name', sort_dir=1):
-        """Find all categories for a user with pagination"""
+    def find_by_user(self, user_id, skip=0, limit=100, sort_by='name', sort_dir=1, count='exact',
+                     raw=False):
+        """
+        Find all categories for a user with pagination
+        With raw=True the categories are returned as plain dicts
+        Raises ValueError on an invalid count mode or sort
+        """
         if isinstance(user_id, str):
             user_id = ObjectId(user_id)
-            
-        # Query for user's categories
-        cursor = self.collection.find({'user_id': user_id})
         
-        # Apply sorting
-        cursor = cursor.sort(sort_by, sort_dir)
+        # Only fields backed by a (user_id, field, _id) index can be sorted on
+        sort = sort_spec(sort_by, sort_dir, self.SORT_FIELDS)
         
-        # Apply pagination
-        total_count = self.collection.count_documents({'user_id': user_id})
-        cursor = cursor.skip(skip).limit(limit)
+        # Other workers' writes only show up in the data version, so it is part of the key
+        key = ('user', user_id, self.versions.get(user_id), skip, limit, sort_by, sort_dir, count)
+        cached = self.cache.get(key)
+        if cached is None:
+            # Query for user's categories
+            cursor = self.collection.find({'user_id': user_id})
+            
+            # Apply sorting
+            cursor = cursor.sort(sort)
+            
+            # Apply pagination
+            total_count = count_documents(self.collection, {'user_id': user_id}, count)
+            cursor = cursor.skip(skip).limit(limit)
+            
+            cached = (list(cursor), total_count)
+            self.cache.set(key, cached)
         
-        # Convert to Category objects
-        categories = [Category.from_dict(category_data) for category_data in cursor]
+        category_docs, total_count = cached
+        
+        # Convert to Category objects, or copies so the cached documents are never modified
+        if raw:
+            categories = [dict(category_data) for category_data in category_docs]
+        else:
+            categories = [Category.from_bson(category_data) for category_data in category_docs]
         
         return {
             'categories': categories,
@@ -75,6 +204,8 @@ class CategoryHandler:
             # Insert into database
             result = self.collection.insert_one(category.to_dict())
             category._id = result.inserted_id
+            self.cache.clear()
+            self.versions.bump(category.user_id)
             return True, category
         except DuplicateKeyError:
             return False, {'error': 'Category with this name already exists for this user'}
@@ -93,14 +224,18 @@ class CategoryHandler:
         update_data.pop('_id', None)
         
         try:
-            result = self.collection.update_one(
+            # Update and get the updated document back in one round trip
+            category_data = self.collection.find_one_and_update(
                 {'_id': category_id},
-                {'$set': update_data}
+                {'$set': update_data},
+                return_document=ReturnDocument.AFTER
             )
+            self.cache.clear()
             
-            if result.modified_count > 0:
-                return True, self.find_by_id(category_id)
-            return False, {'error': 'Category not found or no changes made'}
+            if category_data:
+                self.versions.bump(category_data.get('user_id'))
+                return True, Category.from_bson(category_data)
+            return False, {'error': 'Category not found'}
         except DuplicateKeyError:
             return False, {'error': 'Category with this name already exists for this user'}
         except PyMongoError as e:
@@ -115,8 +250,16 @@ class CategoryHandler:
         # This would require access to the expenses collection
         # For now, we'll assume the caller has handled this check
             
-        result = self.collection.delete_one({'_id': category_id})
-        return result.deleted_count > 0
+        # Get the deleted document back to bump its owner's data version
+        category_data = self.collection.find_one_and_delete({'_id': category_id})
+        self.cache.clear()
+        if not category_data:
+            return False
+        
+        # Its expense counter is left at 0 by the expenses that were deleted or moved
+        ExpenseRollupHandler().remove_usage(category_id)
+        self.versions.bump(category_data.get('user_id'))
+        return True
     
     def create_default_categories(self, user_id):
         """
@@ -125,87 +268,39 @@ class CategoryHandler:
         """
         if isinstance(user_id, str):
             user_id = ObjectId(user_id)
-            
-        # Define default categories
-        default_categories = [
-            {
-                'name': 'Food & Dining',
-                'description': 'Restaurants, groceries, and food delivery',
-                'color': '#FF5733',
-                'icon': 'restaurant'
-            },
-            {
-                'name': 'Transportation',
-                'description': 'Public transit, gas, and vehicle maintenance',
-                'color': '#3498DB',
-                'icon': 'directions_car'
-            },
-            {
-                'name': 'Housing',
-                'description': 'Rent, mortgage, and home maintenance',
-                'color': '#2ECC71',
-                'icon': 'home'
-            },
-            {
-                'name': 'Entertainment',
-                'description': 'Movies, concerts, and other entertainment',
-                'color': '#9B59B6',
-                'icon': 'movie'
-            },
-            {
-                'name': 'Shopping',
-                'description': 'Clothing, electronics, and other retail purchases',
-                'color': '#F39C12',
-                'icon': 'shopping_cart'
-            },
-            {
-                'name': 'Utilities',
-                'description': 'Electricity, water, internet, and phone bills',
-                'color': '#1ABC9C',
-                'icon': 'power'
-            },
-            {
-                'name': 'Healthcare',
-                'description': 'Medical appointments, medications, and insurance',
-                'color': '#E74C3C',
-                'icon': 'local_hospital'
-            },
-            {
-                'name': 'Travel',
-                'description': 'Flights, hotels, and vacation expenses',
-                'color': '#34495E',
-                'icon': 'flight'
-            },
-            {
-                'name': 'Personal Care',
-                'description': 'Haircuts, gym memberships, and personal care items',
-                'color': '#D35400',
-                'icon': 'spa'
-            },
-            {
-                'name': 'Other',
-                'description': 'Miscellaneous expenses',
-                'color': '#7F8C8D',
-                'icon': 'more_horiz'
-            }
-        ]
-        
-        # Add user_id to each category
-        for category in default_categories:
-            category['user_id'] = user_id
-            
-        # Create all categories and track success
-        created_count = 0
-        for category_data in default_categories:
-            try:
-                category = Category(**category_data)
-                self.collection.insert_one(category.to_dict())
-                created_count += 1
-            except DuplicateKeyError:
-                # Skip if category already exists
-                pass
-            except Exception:
-                # Skip on any other error
-                pass
-                
-        return created_count
\ No newline at end of file
+        
+        created_count = self.insert_default_categories(user_id)
+        
+        self.cache.clear()
+        if created_count:
+            self.versions.bump(user_id)
+        return created_count
+    
+    def insert_default_categories(self, user_id, session=None):
+        """
+        Insert the default categories of a user with one unordered insert_many,
+        skipping those the user already has. Used on registration, where the
+        user's data version and the lookup cache can't hold anything yet.
+        Errors other than duplicates are raised when running in a session,
+        so its transaction is aborted.
+        Returns number of categories created
+        """
+        if isinstance(user_id, str):
+            user_id = ObjectId(user_id)
+        
+        documents = [Category(**category_data, user_id=user_id).to_dict()
+                     for category_data in DEFAULT_CATEGORIES]
+        
+        try:
+            result = self.collection.insert_many(documents, ordered=False, session=session)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Duplicates are skipped, the other rows still go in
+            if session is not None and any(error.get('code') != 11000
+                                           for error in e.details.get('writeErrors', [])):
+                raise
+            return e.details.get('nInserted', 0)
+        except PyMongoError:
+            if session is not None:
+                raise
+            return 0
\ No newline at end of file
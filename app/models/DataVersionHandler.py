@@ -0,0 +1,49 @@
+# models/DataVersionHandler.py
+from app.database import get_db
+from bson import ObjectId
+from flask import g, has_request_context
+from pymongo import UpdateOne
+
+class DataVersionHandler:
+    """
+    Repository class for the data_versions collection, which keeps a counter
+    per user that is incremented by every write to the user's expenses or
+    categories, so responses derived from them can be validated cheaply
+    """
+
+    @property
+    def db(self):
+        return get_db().db
+
+    @property
+    def collection(self):
+        return self.db.data_versions
+
+    def get(self, user_id):
+        """Return the current data version of a user, 0 if nothing was written yet"""
+        if isinstance(user_id, str):
+            user_id = ObjectId(user_id)
+
+        # Read once per request, the ETag and the cache keys of a response use the same version
+        versions = g.setdefault('data_versions', {}) if has_request_context() else {}
+        if user_id not in versions:
+            document = self.collection.find_one({'_id': user_id}, {'version': 1})
+            versions[user_id] = document['version'] if document else 0
+        return versions[user_id]
+
+    def bump(self, *user_ids):
+        """Increment the data version of the given users"""
+        user_ids = {ObjectId(user_id) if isinstance(user_id, str) else user_id
+                    for user_id in user_ids if user_id is not None}
+
+        if has_request_context():
+            for user_id in user_ids:
+                g.get('data_versions', {}).pop(user_id, None)
+
+        if len(user_ids) == 1:
+            self.collection.update_one({'_id': user_ids.pop()}, {'$inc': {'version': 1}}, upsert=True)
+        elif user_ids:
+            self.collection.bulk_write([
+                UpdateOne({'_id': user_id}, {'$inc': {'version': 1}}, upsert=True)
+                for user_id in user_ids
+            ], ordered=False)
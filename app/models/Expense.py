@@ -1,12 +1,24 @@
 # models/Expense.py
 from datetime import datetime
 from bson import ObjectId
+from bson.errors import InvalidId
+from types import MappingProxyType
+
+# Shared read-only `extra` for documents without additional fields
+NO_EXTRA = MappingProxyType({})
 
 class Expense:
     """
     Expense model for MongoDB
     """
     
+    # Slots keep per-instance memory down when materializing large pages,
+    # fields not listed here are kept in `extra`
+    __slots__ = ('_id', 'amount', 'description', 'category_id', 'user_id', 'date',
+                 'payment_method', 'created_at', 'updated_at', 'extra')
+    
+    fields = frozenset(__slots__) - {'extra'}
+    
     required_fields = ['amount', 'description', 'category_id', 'user_id', 'date']
     
     def __init__(self, amount, description, category_id, user_id, date=None, 
@@ -22,8 +34,37 @@ class Expense:
         self.updated_at = updated_at or datetime.utcnow()
         
         # Add any additional fields from kwargs
-        for key, value in kwargs.items():
-            setattr(self, key, value)
+        self.extra = kwargs
+    
+    def __getattr__(self, name):
+        # Only called for names that aren't slots, look them up in the additional fields
+        try:
+            return object.__getattribute__(self, 'extra')[name]
+        except (AttributeError, KeyError):
+            raise AttributeError(f"'Expense' object has no attribute '{name}'") from None
+    
+    @classmethod
+    def from_bson(cls, data):
+        """
+        Create an Expense instance from a document read from MongoDB.
+        The document's types are trusted as stored, so no conversion or
+        validation is done. The document is not modified.
+        """
+        expense = cls.__new__(cls)
+        expense._id = data.get('_id')
+        expense.amount = data.get('amount')
+        expense.description = data.get('description')
+        expense.category_id = data.get('category_id')
+        expense.user_id = data.get('user_id')
+        expense.date = data.get('date')
+        expense.payment_method = data.get('payment_method') or "Cash"
+        expense.created_at = data.get('created_at')
+        expense.updated_at = data.get('updated_at')
+        
+        # Keep any additional fields
+        extra_keys = data.keys() - cls.fields
+        expense.extra = {key: data[key] for key in extra_keys} if extra_keys else NO_EXTRA
+        return expense
     
     @classmethod
     def from_dict(cls, data):
@@ -82,7 +123,7 @@ class Expense:
         }
         
         # Include any additional attributes that may have been added
-        for key, value in self.__dict__.items():
+        for key, value in self.extra.items():
             if key not in expense_dict and not key.startswith('_'):
                 expense_dict[key] = value
                 
@@ -93,8 +134,10 @@ class Expense:
         Update the expense with new data
         """
         for key, value in update_data.items():
-            if hasattr(self, key) and key != '_id':
+            if key in self.fields and key != '_id':
                 setattr(self, key, value)
+            elif key in self.extra:
+                self.extra[key] = value
         
         # Always update the updated_at timestamp
         self.updated_at = datetime.utcnow()
@@ -121,4 +164,38 @@ class Expense:
             except ValueError:
                 errors['amount'] = "Amount must be a number"
         
+        return len(errors) == 0, errors
+    
+    @staticmethod
+    def validate_update(update_data):
+        """
+        Validate the fields of a partial update and convert them to their stored types
+        amount becomes a float and ids ObjectIds, update_data is modified in place
+        Returns (is_valid, errors)
+        """
+        errors = {}
+        
+        # Required fields can be changed but not removed
+        for field in Expense.required_fields:
+            if field in update_data and update_data[field] is None:
+                errors[field] = f"{field} is required"
+        
+        if update_data.get('amount') is not None:
+            try:
+                update_data['amount'] = float(update_data['amount'])
+                if update_data['amount'] <= 0:
+                    errors['amount'] = "Amount must be positive"
+            except (TypeError, ValueError):
+                errors['amount'] = "Amount must be a number"
+        
+        if update_data.get('date') is not None and not isinstance(update_data['date'], datetime):
+            errors['date'] = "Date must be an ISO 8601 date"
+        
+        for field in ('category_id', 'user_id'):
+            if isinstance(update_data.get(field), str):
+                try:
+                    update_data[field] = ObjectId(update_data[field])
+                except InvalidId:
+                    errors[field] = f"Invalid {field}"
+        
         return len(errors) == 0, errors
\ No newline at end of file
@@ -1,46 +1,119 @@
 # models/ExpenseHandler.py
+import asyncio
+import hashlib
+import inspect
 from app.database import get_db
 from app.models.Expense import Expense
-from bson import ObjectId
-from datetime import datetime
-from pymongo.errors import PyMongoError
+from app.models.ExpenseRollupHandler import ExpenseRollupHandler, category_lookup_stages
+from app.models.DataVersionHandler import DataVersionHandler
+from app.cache import make_result_cache
+from app.pagination import encode_cursor, decode_cursor, seek_query, count_documents, sort_spec
+from bson import ObjectId, json_util
+from datetime import datetime, timezone
+from flask import current_app
+from functools import wraps
+from bson.errors import InvalidId
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+def summary_cache_key(kind, user_id, version, args, kwargs):
+    """Key of a summary result in the summary result cache"""
+    arguments = hashlib.sha1(repr((args, sorted(kwargs.items()))).encode('utf-8')).hexdigest()
+    return f'summary:{kind}:{user_id}:{version}:{arguments}'
+
+def cached_summary(kind):
+    """
+    Cache the result of a summary method in the summary result cache,
+    keyed by user, arguments and the user's data version so any write to
+    the user's expenses or categories makes the old entries unreachable.
+    Coroutine methods (the async handlers) share the same entries, and read
+    and write them in a worker thread since the cache backends block.
+    """
+    def decorator(method):
+        if inspect.iscoroutinefunction(method):
+            @wraps(method)
+            async def async_wrapper(self, user_id, *args, **kwargs):
+                if self.summary_cache is None:
+                    return await method(self, user_id, *args, **kwargs)
+                
+                version = await self.versions.get(user_id)
+                key = summary_cache_key(kind, user_id, version, args, kwargs)
+                
+                cached = await asyncio.to_thread(self.summary_cache.get, key)
+                if cached is not None:
+                    return json_util.loads(cached)
+                
+                result = await method(self, user_id, *args, **kwargs)
+                await asyncio.to_thread(self.summary_cache.set, key, json_util.dumps(result))
+                return result
+            return async_wrapper
+        
+        @wraps(method)
+        def wrapper(self, user_id, *args, **kwargs):
+            if self.summary_cache is None:
+                return method(self, user_id, *args, **kwargs)
+            
+            # Read the version first so a concurrent write can only make the entry unreachable
+            version = self.versions.get(user_id)
+            key = summary_cache_key(kind, user_id, version, args, kwargs)
+            
+            cached = self.summary_cache.get(key)
+            if cached is not None:
+                return json_util.loads(cached)
+            
+            result = method(self, user_id, *args, **kwargs)
+            self.summary_cache.set(key, json_util.dumps(result))
+            return result
+        return wrapper
+    return decorator
 
 class ExpenseHandler:
     """
     Repository class for handling Expense document operations in MongoDB
     """
     
+    # Fields a user's expenses can be sorted on, each backed by an index in app/indexes.py
+    SORT_FIELDS = ('date', 'amount', 'description', 'created_at')
+    
+    @property
+    def db(self):
+        """Resolved on every use so the client can be replaced after a fork"""
+        return get_db().db
+    
+    @property
+    def collection(self):
+        return self.db.expenses
+    
     def __init__(self):
-        self.db = get_db().db
-        self.collection = self.db.expenses
-        
-        # Ensure indexes for performance
-        self._ensure_indexes()
-    
-    def _ensure_indexes(self):
-        """Create necessary indexes for the expenses collection"""
-        # Index by user_id for faster querying of a user's expenses
-        self.collection.create_index('user_id')
-        # Index by category_id for faster category filtering
-        self.collection.create_index('category_id')
-        # Compound index for date-based queries per user
-        self.collection.create_index([('user_id', 1), ('date', -1)])
-    
-    def find_by_id(self, expense_id):
-        """Find an expense by its ID"""
+        # Pre-aggregated monthly totals kept current on every write
+        self.rollups = ExpenseRollupHandler()
+        self.use_rollups = current_app.config.get('USE_EXPENSE_ROLLUPS', False)
+        
+        # Per-user data versions, bumped on every write
+        self.versions = DataVersionHandler()
+        
+        # Summary results, shared by the workers unless the backend is memory
+        self.summary_cache = make_result_cache(current_app.config)
+    
+    def find_by_id(self, expense_id, raw=False):
+        """
+        Find an expense by its ID
+        With raw=True the document is returned as a plain dict
+        """
         if isinstance(expense_id, str):
             expense_id = ObjectId(expense_id)
             
         expense_data = self.collection.find_one({'_id': expense_id})
-        if expense_data:
-            return Expense.from_dict(expense_data)
-        return None
+        if expense_data and not raw:
+            return Expense.from_bson(expense_data)
+        return expense_data
     
-    def find_by_user(self, user_id, skip=0, limit=50, sort_by='date', sort_dir=-1, 
-                     start_date=None, end_date=None, category_id=None):
-        """
-        Find all expenses for a user with optional filtering and pagination
-        """
+    @staticmethod
+    def _user_query(user_id, start_date=None, end_date=None, category_id=None):
+        """Build the query for a user's expenses with optional date and category filters"""
         if isinstance(user_id, str):
             user_id = ObjectId(user_id)
             
@@ -63,27 +136,129 @@ class ExpenseHandler:
             if isinstance(category_id, str):
                 category_id = ObjectId(category_id)
             query['category_id'] = category_id
+        
+        return query
+    
+    def find_by_user(self, user_id, skip=0, limit=50, sort_by='date', sort_dir=-1, 
+                     start_date=None, end_date=None, category_id=None, after=None, count='exact',
+                     expand_category=False, raw=False):
+        """
+        Find all expenses for a user with optional filtering and pagination
+        
+        Pass the next_cursor of a previous page as `after` to continue from it
+        instead of skipping, and count='estimate' or 'none' to avoid an exact
+        count of the matching expenses. Raises ValueError on an invalid
+        cursor, count mode or sort
+        
+        With expand_category each expense gets a `category` attribute holding
+        the name, color and icon of its category, joined in the same query
+        
+        With raw=True the expenses are returned as plain dicts
+        """
+        query, page_query, sort, skip, pipeline = self.page_plan(
+            user_id, skip, limit, sort_by, sort_dir, start_date, end_date, category_id, after,
+            expand_category
+        )
             
-        # Execute query with pagination
-        cursor = self.collection.find(query)
+        total_count = count_documents(self.collection, query, count)
         
-        # Apply sorting
-        cursor = cursor.sort(sort_by, sort_dir)
+        if pipeline:
+            cursor = self.collection.aggregate(pipeline)
+        else:
+            # Execute query with pagination
+            cursor = self.collection.find(page_query)
+            
+            # Apply sorting, _id breaks ties so the order is stable across pages
+            cursor = cursor.sort(sort)
+            
+            # Apply pagination
+            cursor = cursor.skip(skip).limit(limit)
         
-        # Apply pagination
-        total_count = self.collection.count_documents(query)
-        cursor = cursor.skip(skip).limit(limit)
+        expense_docs = list(cursor)
+        next_cursor = self.next_cursor(expense_docs, limit, sort_by, sort_dir)
         
         # Convert to Expense objects
-        expenses = [Expense.from_dict(expense_data) for expense_data in cursor]
+        if raw:
+            expenses = expense_docs
+        else:
+            expenses = [Expense.from_bson(expense_data) for expense_data in expense_docs]
         
         return {
             'expenses': expenses,
             'total': total_count,
             'skip': skip,
-            'limit': limit
+            'limit': limit,
+            'next_cursor': next_cursor
         }
     
+    def page_plan(self, user_id, skip=0, limit=50, sort_by='date', sort_dir=-1, start_date=None,
+                  end_date=None, category_id=None, after=None, expand_category=False):
+        """
+        Build the queries behind find_by_user, shared with the async handlers
+        Returns (count query, page query, sort, skip, pipeline), where pipeline
+        is None unless expand_category asks for an aggregation
+        Raises ValueError on an invalid cursor, sort, skip or limit
+        """
+        if skip < 0 or limit < 0:
+            raise ValueError('skip and limit must not be negative')
+        
+        # Only fields backed by a (user_id, field, _id) index can be sorted on
+        sort = sort_spec(sort_by, sort_dir, self.SORT_FIELDS)
+        
+        # Build query
+        query = self._user_query(user_id, start_date, end_date, category_id)
+        
+        # Continue after the cursor position instead of skipping
+        page_query = query
+        if after:
+            value, last_id = decode_cursor(after, sort_by, sort_dir)
+            page_query = {'$and': [query, seek_query(sort_by, sort_dir, value, last_id)]}
+            skip = 0
+        
+        pipeline = None
+        if expand_category:
+            # Same query as an aggregation so the categories are joined server-side,
+            # a limit of 0 means no limit like it does for find
+            pipeline = [
+                {'$match': page_query},
+                {'$sort': dict(sort)},
+                {'$skip': skip}
+            ] + ([{'$limit': limit}] if limit else []) + category_lookup_stages('category_id')
+        
+        return query, page_query, sort, skip, pipeline
+    
+    @staticmethod
+    def next_cursor(expense_docs, limit, sort_by, sort_dir):
+        """Cursor for the next page, only when this page came back full"""
+        if expense_docs and len(expense_docs) == limit:
+            last = expense_docs[-1]
+            return encode_cursor(sort_by, sort_dir, last.get(sort_by), last['_id'])
+        return None
+    
+    def iter_by_user(self, user_id, start_date=None, end_date=None, category_id=None,
+                     fields=None, batch_size=1000):
+        """
+        Iterate over all of a user's expenses, newest first, as raw documents
+        Documents are streamed from the cursor in batches of batch_size and
+        only the given fields are fetched when fields is provided
+        The query is built right away, so invalid ids raise InvalidId here
+        rather than on the first read
+        """
+        query = self._user_query(user_id, start_date, end_date, category_id)
+        
+        cursor = self.collection.find(query, fields)
+        cursor = cursor.sort([('date', -1), ('_id', -1)]).batch_size(batch_size)
+        return self._iter_cursor(cursor)
+    
+    @staticmethod
+    def _iter_cursor(cursor):
+        """Yield the documents of a cursor, closing it when iteration stops"""
+        try:
+            for expense_data in cursor:
+                yield expense_data
+        finally:
+            cursor.close()
+    
     def create(self, expense_data):
         """
         Create a new expense
@@ -108,9 +283,97 @@ class ExpenseHandler:
             # Insert into database
             result = self.collection.insert_one(expense.to_dict())
             expense._id = result.inserted_id
-            return True, expense
         except PyMongoError as e:
             return False, {'error': str(e)}
+        
+        # The expense is stored from here on, so it is reported as created either way
+        self._after_insert([expense.to_dict()])
+        return True, expense
+    
+    def _after_insert(self, documents):
+        """
+        Add inserted expenses to the rollups and bump their users' data versions
+        Failures are logged rather than reported, a client told the insert failed
+        would retry it and store the expenses twice
+        """
+        try:
+            self.rollups.apply([(document, 1) for document in documents])
+        except PyMongoError as e:
+            current_app.logger.error('Rollups not updated for %d new expenses, run `flask rollups rebuild` '
+                                     'to recompute them: %s', len(documents), e)
+        
+        try:
+            self.versions.bump(*(document['user_id'] for document in documents))
+        except PyMongoError as e:
+            current_app.logger.error('Data versions not bumped for %d new expenses, cached summaries stay '
+                                     'stale until the next write: %s', len(documents), e)
+    
+    def create_many(self, rows, chunk_size=1000):
+        """
+        Create expenses from an iterable of dicts, validating each row and
+        inserting the valid ones in unordered chunks of chunk_size.
+        Rows are consumed lazily so the iterable can be a stream.
+        Returns {'inserted': count, 'errors': [{'index': row index, 'errors': {...}}]}
+        """
+        inserted = 0
+        errors = []
+        chunk = []
+        
+        for index, expense_data in enumerate(rows):
+            if not isinstance(expense_data, dict):
+                errors.append({'index': index, 'errors': {'row': 'Row must be a JSON object'}})
+                continue
+            
+            try:
+                # Validate expense data
+                is_valid, row_errors = Expense.validate(expense_data)
+                if not is_valid:
+                    errors.append({'index': index, 'errors': row_errors})
+                    continue
+                
+                # Set timestamps
+                now = datetime.utcnow()
+                expense_data.setdefault('created_at', now)
+                expense_data.setdefault('updated_at', now)
+                
+                expense = Expense(**expense_data)
+            except (TypeError, ValueError, InvalidId) as e:
+                errors.append({'index': index, 'errors': {'row': str(e)}})
+                continue
+            
+            chunk.append((index, expense.to_dict()))
+            if len(chunk) >= chunk_size:
+                inserted += self._insert_chunk(chunk, errors)
+                chunk = []
+        
+        if chunk:
+            inserted += self._insert_chunk(chunk, errors)
+        
+        return {'inserted': inserted, 'errors': errors}
+    
+    def _insert_chunk(self, chunk, errors):
+        """
+        Insert a chunk of (row index, document) pairs with one unordered insert_many
+        Failed rows are added to errors, returns the number of inserted documents
+        """
+        failed = set()
+        try:
+            self.collection.insert_many([document for _, document in chunk], ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get('writeErrors', []):
+                failed.add(write_error['index'])
+                errors.append({
+                    'index': chunk[write_error['index']][0],
+                    'errors': {'error': write_error.get('errmsg')}
+                })
+        except PyMongoError as e:
+            for index, _ in chunk:
+                errors.append({'index': index, 'errors': {'error': str(e)}})
+            return 0
+        
+        written = [document for position, (_, document) in enumerate(chunk) if position not in failed]
+        self._after_insert(written)
+        return len(written)
     
     def update(self, expense_id, update_data):
         """
@@ -120,48 +383,308 @@ class ExpenseHandler:
         if isinstance(expense_id, str):
             expense_id = ObjectId(expense_id)
             
-        # Get the existing expense
-        expense = self.find_by_id(expense_id)
-        if not expense:
-            return False, {'error': 'Expense not found'}
-            
+        # Remove _id from updates if present
+        update_data.pop('_id', None)
+        
+        # Check and convert the new values before anything is written
+        is_valid, errors = Expense.validate_update(update_data)
+        if not is_valid:
+            return False, errors
+        
         # Set updated timestamp
         update_data['updated_at'] = datetime.utcnow()
-        
-        # Handle category_id conversion if string
-        if 'category_id' in update_data and isinstance(update_data['category_id'], str):
-            update_data['category_id'] = ObjectId(update_data['category_id'])
             
         try:
-            # Update the expense object
-            expense.update(update_data)
-            
-            # Update in database
-            result = self.collection.update_one(
+            # Update in database, getting the previous values back to update the rollups
+            previous = self.collection.find_one_and_update(
                 {'_id': expense_id},
-                {'$set': update_data}
+                {'$set': update_data},
+                return_document=ReturnDocument.BEFORE
             )
-            
-            if result.modified_count > 0:
-                return True, expense
-            return False, {'error': 'No changes made'}
         except PyMongoError as e:
             return False, {'error': str(e)}
+        
+        if not previous:
+            return False, {'error': 'Expense not found'}
+        
+        # $set only replaces top-level fields, so the new document is the old one with them applied
+        expense_data = {**previous, **update_data}
+        self.rollups.move(previous, expense_data)
+        self.versions.bump(previous['user_id'], expense_data['user_id'])
+        return True, Expense.from_bson(expense_data)
     
     def delete(self, expense_id):
         """Delete an expense by its ID"""
         if isinstance(expense_id, str):
             expense_id = ObjectId(expense_id)
             
-        result = self.collection.delete_one({'_id': expense_id})
-        return result.deleted_count > 0
+        # Get the deleted document back to remove it from the rollups
+        expense_data = self.collection.find_one_and_delete({'_id': expense_id})
+        if not expense_data:
+            return False
+        
+        self.rollups.remove(expense_data)
+        self.versions.bump(expense_data['user_id'])
+        return True
+    
+    @staticmethod
+    def _batch_key(expense_id):
+        """Key of an id given in a batch, the same for every spelling of an ObjectId"""
+        # ObjectId(None) would make up a new id, so only strings and ObjectIds are converted
+        if isinstance(expense_id, (str, ObjectId)) and ObjectId.is_valid(expense_id):
+            return str(ObjectId(expense_id))
+        return str(expense_id)
+    
+    def _parse_ids(self, expense_ids):
+        """
+        Convert the ids of a batch to ObjectIds, dropping duplicates
+        Returns (list of ObjectIds, {key: error} for the invalid ids)
+        """
+        ids = {}
+        errors = {}
+        for expense_id in expense_ids:
+            if isinstance(expense_id, (str, ObjectId)) and ObjectId.is_valid(expense_id):
+                ids.setdefault(ObjectId(expense_id))
+            else:
+                errors[self._batch_key(expense_id)] = 'Invalid expense id'
+        return list(ids), errors
+    
+    def _batch_results(self, expense_ids, found, errors):
+        """Per-id results of a batch in request order, from {key: document} and {key: error}"""
+        results = []
+        for expense_id in expense_ids:
+            key = self._batch_key(expense_id)
+            if isinstance(errors.get(key), dict):
+                # Field errors of an invalid update, keyed like the single expense routes
+                results.append({'_id': expense_id, 'errors': errors[key]})
+            elif key in errors:
+                results.append({'_id': expense_id, 'error': errors[key]})
+            elif key in found:
+                results.append({'_id': expense_id, 'expense': found[key]})
+            else:
+                results.append({'_id': expense_id, 'error': 'Expense not found'})
+        return results
+    
+    def _find_by_ids(self, ids):
+        """Read expenses with one $in query, returns {key: document}"""
+        if not ids:
+            return {}
+        return {str(expense_data['_id']): expense_data
+                for expense_data in self.collection.find({'_id': {'$in': ids}})}
+    
+    def find_by_ids(self, expense_ids):
+        """
+        Find expenses by their IDs with one $in query, as plain dicts
+        Returns a result per id, in order: {'_id', 'expense'} or {'_id', 'error'}
+        """
+        ids, errors = self._parse_ids(expense_ids)
+        return self._batch_results(expense_ids, self._find_by_ids(ids), errors)
+    
+    def update_by_ids(self, updates):
+        """
+        Update many expenses with one bulk_write, each entry of updates being
+        a dict with the expense's `_id` and the fields to set
+        The expenses are read first with one $in query to update the rollups,
+        and only written if they haven't been updated since
+        Returns a result per entry, in order: {'_id', 'expense'}, {'_id', 'error'}
+        or {'_id', 'errors'} with the invalid fields
+        """
+        # MongoDB keeps milliseconds, truncate so the timestamp can be matched after the write
+        now = datetime.utcnow()
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        expense_ids = [update_data.get('_id') for update_data in updates]
+        _, errors = self._parse_ids(expense_ids)
+        
+        # Each expense can only be updated once per batch
+        changes = {}
+        duplicates = set()
+        for update_data in updates:
+            key = self._batch_key(update_data.get('_id'))
+            if key in errors:
+                continue
+            if key in changes:
+                duplicates.add(key)
+                continue
+            
+            # Check and convert the new values before anything is written
+            update_data = {field: value for field, value in update_data.items() if field != '_id'}
+            is_valid, field_errors = Expense.validate_update(update_data)
+            if not is_valid:
+                errors[key] = field_errors
+                continue
+            update_data['updated_at'] = now
+            changes[key] = update_data
+        
+        for key in duplicates:
+            changes.pop(key, None)
+            errors[key] = 'Expense listed more than once'
+        
+        previous = self._find_by_ids([ObjectId(key) for key in changes])
+        
+        # Only write the expenses as they were read, so the rollups stay in step
+        keys = [key for key in changes if key in previous]
+        operations = [
+            UpdateOne({'_id': previous[key]['_id'], 'updated_at': previous[key].get('updated_at')},
+                      {'$set': changes[key]})
+            for key in keys
+        ]
+        
+        written = set(keys)
+        if operations:
+            try:
+                matched = self.collection.bulk_write(operations, ordered=False).matched_count
+            except BulkWriteError as e:
+                for write_error in e.details.get('writeErrors', []):
+                    key = keys[write_error['index']]
+                    errors[key] = write_error.get('errmsg')
+                    written.discard(key)
+                matched = e.details.get('nMatched', 0)
+            except PyMongoError as e:
+                errors.update({key: str(e) for key in keys})
+                return self._batch_results(expense_ids, {}, errors)
+            
+            if matched < len(written):
+                # Some expenses were edited or deleted in the meantime, find out which were written
+                query = {'_id': {'$in': [previous[key]['_id'] for key in written]}, 'updated_at': now}
+                written &= {str(expense_data['_id']) for expense_data in self.collection.find(query, {'_id': 1})}
+                for key in set(keys) - written:
+                    errors.setdefault(key, 'Expense was modified concurrently, retry')
+        
+        # $set only replaces top-level fields, so the new documents are the old ones with them applied
+        found = {key: {**previous[key], **changes[key]} for key in written}
+        self.rollups.apply([(previous[key], -1) for key in written] +
+                           [(expense_data, 1) for expense_data in found.values()])
+        self.versions.bump(*(previous[key]['user_id'] for key in written),
+                           *(expense_data['user_id'] for expense_data in found.values()))
+        
+        return self._batch_results(expense_ids, found, errors)
+    
+    def delete_by_ids(self, expense_ids):
+        """
+        Delete many expenses with one unordered bulk_write of DeleteOnes
+        The expenses are read first with one $in query to update the rollups,
+        and only deleted if they haven't been updated since
+        Returns a result per id, in order: {'_id', 'expense'} with the deleted
+        expense or {'_id', 'error'}
+        """
+        ids, errors = self._parse_ids(expense_ids)
+        previous = self._find_by_ids(ids)
+        
+        # Only delete the expenses as they were read, so the rollups stay in step
+        keys = list(previous)
+        operations = [
+            DeleteOne({'_id': previous[key]['_id'], 'updated_at': previous[key].get('updated_at')})
+            for key in keys
+        ]
+        
+        deleted = set(keys)
+        if not operations:
+            return self._batch_results(expense_ids, {}, errors)
+        
+        try:
+            deleted_count = self.collection.bulk_write(operations, ordered=False).deleted_count
+        except BulkWriteError as e:
+            for write_error in e.details.get('writeErrors', []):
+                key = keys[write_error['index']]
+                errors[key] = write_error.get('errmsg')
+                deleted.discard(key)
+            deleted_count = e.details.get('nRemoved', 0)
+        except PyMongoError as e:
+            errors.update({key: str(e) for key in keys})
+            return self._batch_results(expense_ids, {}, errors)
+        
+        recount = False
+        if deleted_count < len(deleted):
+            # Expenses that are still there were edited in the meantime
+            query = {'_id': {'$in': [previous[key]['_id'] for key in deleted]}}
+            remaining = {str(expense_data['_id']) for expense_data in self.collection.find(query, {'_id': 1})}
+            for key in remaining:
+                errors[key] = 'Expense was modified concurrently, retry'
+            deleted -= remaining
+            
+            # The others are gone, but some were deleted by another request at the
+            # same time, which can't be told apart from ours, so their users'
+            # rollups are recounted rather than guessed
+            recount = deleted_count < len(deleted)
+        
+        found = {key: previous[key] for key in deleted}
+        user_ids = {expense_data['user_id'] for expense_data in found.values()}
+        if recount:
+            for user_id in user_ids:
+                self.rollups.rebuild(user_id)
+        else:
+            self.rollups.apply([(expense_data, -1) for expense_data in found.values()])
+        self.versions.bump(*user_ids)
+        
+        return self._batch_results(expense_ids, found, errors)
+    
+    def category_in_use(self, category_id):
+        """
+        Whether any expense belongs to a category, read from the category's
+        expense counter, which every write keeps up to date
+        """
+        if isinstance(category_id, str):
+            category_id = ObjectId(category_id)
+        
+        # Counters only undercount, for expenses written before the first
+        # rollup rebuild, so a positive count can be trusted as is, and no
+        # count as well once a rebuild has run
+        if (self.rollups.usage_count(category_id) or 0) > 0:
+            return True
+        if self.rollups.usage_complete():
+            return False
+        
+        return self.collection.find_one({'category_id': category_id}, {'_id': 1}) is not None
+    
+    def reassign_category(self, user_id, source_id, target_id):
+        """
+        Move all of a user's expenses from one category to another with one update_many,
+        along with their rollups and expense count
+        Returns the number of expenses moved
+        """
+        if isinstance(user_id, str):
+            user_id = ObjectId(user_id)
+        if isinstance(source_id, str):
+            source_id = ObjectId(source_id)
+        if isinstance(target_id, str):
+            target_id = ObjectId(target_id)
+        
+        result = self.collection.update_many(
+            {'user_id': user_id, 'category_id': source_id},
+            {'$set': {'category_id': target_id, 'updated_at': datetime.utcnow()}}
+        )
+        
+        self.rollups.move_category(user_id, source_id, target_id, result.modified_count)
+        self.versions.bump(user_id)
+        return result.modified_count
+    
+    def _run_plan(self, plan):
+        """Run a (collection name, pipeline, formatter) plan built by one of the *_plan methods"""
+        collection_name, pipeline, formatter = plan
+        result = list(self.db[collection_name].aggregate(pipeline))
+        return formatter(result) if formatter else result
     
-    def get_summary_by_category(self, user_id, start_date=None, end_date=None):
+    @cached_summary('category')
+    def get_summary_by_category(self, user_id, start_date=None, end_date=None, expand_category=False):
         """
         Get a summary of expenses grouped by category
+        With expand_category each group also gets the category's name, color and icon
+        """
+        return self._run_plan(self.category_summary_plan(user_id, start_date, end_date, expand_category))
+    
+    def category_summary_plan(self, user_id, start_date=None, end_date=None, expand_category=False):
+        """
+        Build the aggregation behind get_summary_by_category, shared with the async handlers
+        Returns (collection name, pipeline, formatter or None)
         """
         if isinstance(user_id, str):
             user_id = ObjectId(user_id)
+        
+        # Serve month-aligned ranges from the rollups
+        periods = ExpenseRollupHandler.month_range(start_date, end_date)
+        if self.use_rollups and periods:
+            pipeline = self.rollups.category_summary_pipeline(user_id, *periods, expand_category)
+            return 'expense_rollups', pipeline, None
             
         # Build match query
         match_query = {'user_id': user_id}
@@ -188,21 +711,36 @@ class ExpenseHandler:
             {'$sort': {'total': -1}}
         ]
         
-        # Execute aggregation
-        result = list(self.collection.aggregate(pipeline))
+        # Join the category details
+        if expand_category:
+            pipeline += category_lookup_stages('_id')
         
-        return result
+        return 'expenses', pipeline, None
     
+    @cached_summary('month')
     def get_summary_by_month(self, user_id, year=None):
         """
         Get a summary of expenses grouped by month for a specific year
         """
+        return self._run_plan(self.month_summary_plan(user_id, year))
+    
+    def month_summary_plan(self, user_id, year=None):
+        """
+        Build the aggregation behind get_summary_by_month, shared with the async handlers
+        Returns (collection name, pipeline, formatter)
+        """
         if isinstance(user_id, str):
             user_id = ObjectId(user_id)
             
         # Set default year to current year if not provided
         if not year:
             year = datetime.utcnow().year
+        
+        # A whole year always lines up with month boundaries
+        if self.use_rollups:
+            pipeline = self.rollups.month_summary_pipeline(user_id, year)
+            return 'expense_rollups', pipeline, lambda result: self._format_month_summary(
+                ExpenseRollupHandler.month_numbers(result))
             
         # Build match query
         start_date = datetime(year, 1, 1)
@@ -227,31 +765,42 @@ class ExpenseHandler:
             {'$sort': {'_id': 1}}
         ]
         
-        # Execute aggregation
-        result = list(self.collection.aggregate(pipeline))
-        
-        # Format result with month names
-        month_names = ['January', 'February', 'March', 'April', 'May', 'June', 
-                       'July', 'August', 'September', 'October', 'November', 'December']
-        
+        return 'expenses', pipeline, self._format_month_summary
+    
+    @staticmethod
+    def _format_month_summary(result):
+        """Format a month-grouped aggregation result with month names"""
         formatted_result = []
         for item in result:
             month_index = item['_id'] - 1  # MongoDB month is 1-indexed
             formatted_result.append({
                 'month': month_index + 1,
-                'month_name': month_names[month_index],
+                'month_name': MONTH_NAMES[month_index],
                 'total': item['total'],
                 'count': item['count']
             })
             
         return formatted_result
     
+    @cached_summary('payment_method')
     def get_summary_by_payment_method(self, user_id, start_date=None, end_date=None):
         """
         Get a summary of expenses grouped by payment method
         """
+        return self._run_plan(self.payment_method_summary_plan(user_id, start_date, end_date))
+    
+    def payment_method_summary_plan(self, user_id, start_date=None, end_date=None):
+        """
+        Build the aggregation behind get_summary_by_payment_method, shared with the async handlers
+        Returns (collection name, pipeline, formatter or None)
+        """
         if isinstance(user_id, str):
             user_id = ObjectId(user_id)
+        
+        # Serve month-aligned ranges from the rollups
+        periods = ExpenseRollupHandler.month_range(start_date, end_date)
+        if self.use_rollups and periods:
+            return 'expense_rollups', self.rollups.payment_method_summary_pipeline(user_id, *periods), None
             
         # Build match query
         match_query = {'user_id': user_id}
@@ -278,7 +827,121 @@ class ExpenseHandler:
             {'$sort': {'total': -1}}
         ]
         
-        # Execute aggregation
-        result = list(self.collection.aggregate(pipeline))
+        return 'expenses', pipeline, None
+    
+    def get_dashboard_summary(self, user_id, start_date=None, end_date=None, year=None, limit=100,
+                              raw=False):
+        """
+        Get everything the dashboard needs in a single aggregation:
+        the most recent expenses, the totals for the date range and the
+        summaries by category, month and payment method
+        With raw=True the expenses are returned as plain dicts
+        """
+        # Execute aggregation, $facet always returns a single document
+        result = next(self.collection.aggregate(self.dashboard_pipeline(user_id, start_date, end_date,
+                                                                        year, limit)))
+        return self.format_dashboard(result, raw)
+    
+    def dashboard_pipeline(self, user_id, start_date=None, end_date=None, year=None, limit=100):
+        """
+        Build the $facet aggregation behind get_dashboard_summary, shared with the async handlers
+        A limit of 0 returns every expense of the period
+        Raises ValueError on a negative limit or a year out of range
+        """
+        if limit < 0:
+            raise ValueError('limit must not be negative')
+        
+        if isinstance(user_id, str):
+            user_id = ObjectId(user_id)
+            
+        # Set default year to current year if not provided
+        if not year:
+            year = datetime.utcnow().year
+            
+        year_start = datetime(year, 1, 1)
+        year_end = datetime(year, 12, 31, 23, 59, 59)
+        
+        # Dates are stored as naive UTC, normalize so they compare with the year bounds
+        if start_date and start_date.tzinfo:
+            start_date = start_date.astimezone(timezone.utc).replace(tzinfo=None)
+        if end_date and end_date.tzinfo:
+            end_date = end_date.astimezone(timezone.utc).replace(tzinfo=None)
+        
+        # Date filter for the selected period
+        range_query = {}
+        if start_date:
+            range_query['$gte'] = start_date
+        if end_date:
+            range_query['$lte'] = end_date
+        
+        # The shared $match has to cover both the selected period and the
+        # year used by the monthly summary, each facet then narrows it down
+        match_query = {'user_id': user_id}
+        if start_date and end_date:
+            match_query['date'] = {
+                '$gte': min(start_date, year_start),
+                '$lte': max(end_date, year_end)
+            }
+        elif start_date:
+            match_query['date'] = {'$gte': min(start_date, year_start)}
+        elif end_date:
+            match_query['date'] = {'$lte': max(end_date, year_end)}
+        
+        range_stages = [{'$match': {'date': range_query}}] if range_query else []
+        
+        # Aggregation pipeline
+        pipeline = [
+            {'$match': match_query},
+            {'$facet': {
+                'expenses': range_stages + [{'$sort': {'date': -1}}] + ([{'$limit': limit}] if limit else []),
+                'totals': range_stages + [
+                    {'$group': {
+                        '_id': None,
+                        'total': {'$sum': '$amount'},
+                        'count': {'$sum': 1}
+                    }}
+                ],
+                'by_category': range_stages + [
+                    {'$group': {
+                        '_id': '$category_id',
+                        'total': {'$sum': '$amount'},
+                        'count': {'$sum': 1}
+                    }},
+                    {'$sort': {'total': -1}}
+                ],
+                'by_month': [
+                    {'$match': {'date': {'$gte': year_start, '$lte': year_end}}},
+                    {'$group': {
+                        '_id': {'$month': '$date'},
+                        'total': {'$sum': '$amount'},
+                        'count': {'$sum': 1}
+                    }},
+                    {'$sort': {'_id': 1}}
+                ],
+                'by_payment_method': range_stages + [
+                    {'$group': {
+                        '_id': '$payment_method',
+                        'total': {'$sum': '$amount'},
+                        'count': {'$sum': 1}
+                    }},
+                    {'$sort': {'total': -1}}
+                ]
+            }}
+        ]
+        
+        return pipeline
+    
+    def format_dashboard(self, result, raw=False):
+        """Shape the single document returned by the dashboard aggregation"""
+        totals = result['totals'][0] if result['totals'] else {'total': 0, 'count': 0}
         
-        return result
\ No newline at end of file
+        return {
+            'expenses': result['expenses'] if raw else [
+                Expense.from_bson(expense_data) for expense_data in result['expenses']
+            ],
+            'total': totals['total'],
+            'count': totals['count'],
+            'by_category': result['by_category'],
+            'by_month': self._format_month_summary(result['by_month']),
+            'by_payment_method': result['by_payment_method']
+        }
@@ -0,0 +1,346 @@
+# models/ExpenseRollupHandler.py
+from app.database import get_db
+from bson import ObjectId
+from calendar import monthrange
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+
+def category_lookup_stages(local_field):
+    """
+    Aggregation stages that join the name, color and icon of the category
+    referenced by local_field into a `category` sub-document
+    """
+    return [
+        {'$lookup': {
+            'from': 'categories',
+            'localField': local_field,
+            'foreignField': '_id',
+            'as': 'category'
+        }},
+        {'$unwind': {'path': '$category', 'preserveNullAndEmptyArrays': True}},
+        {'$addFields': {'category': {
+            'name': '$category.name',
+            'color': '$category.color',
+            'icon': '$category.icon'
+        }}}
+    ]
+
+class ExpenseRollupHandler:
+    """
+    Repository class for the expense_rollups collection, which keeps the
+    total and count of a user's expenses per month, category and payment method,
+    and the category_usage collection, which keeps the number of expenses per category
+    """
+
+    # Set once a full rebuild has recorded that every category has an exact counter
+    _usage_complete = False
+
+    @property
+    def db(self):
+        return get_db().db
+
+    @property
+    def collection(self):
+        return self.db.expense_rollups
+
+    @property
+    def usage(self):
+        return self.db.category_usage
+
+    @property
+    def state(self):
+        return self.db.rollup_state
+
+    @staticmethod
+    def period_of(date):
+        """Return the rollup period (YYYY-MM) for a date, in UTC like $dateToString"""
+        if date.tzinfo:
+            date = date.astimezone(timezone.utc).replace(tzinfo=None)
+        return date.strftime('%Y-%m')
+
+    @staticmethod
+    def month_range(start_date=None, end_date=None):
+        """
+        Return the (start_period, end_period) covered by a date range, or None
+        when the range doesn't line up with month boundaries and the rollups
+        can't answer it exactly. Open ends are returned as None.
+        """
+        # Dates are stored as naive UTC
+        if start_date and start_date.tzinfo:
+            start_date = start_date.astimezone(timezone.utc).replace(tzinfo=None)
+        if end_date and end_date.tzinfo:
+            end_date = end_date.astimezone(timezone.utc).replace(tzinfo=None)
+
+        start_period = None
+        if start_date:
+            if start_date != datetime(start_date.year, start_date.month, 1):
+                return None
+            start_period = ExpenseRollupHandler.period_of(start_date)
+
+        end_period = None
+        if end_date:
+            last_day = monthrange(end_date.year, end_date.month)[1]
+            if end_date < datetime(end_date.year, end_date.month, last_day, 23, 59, 59):
+                return None
+            end_period = ExpenseRollupHandler.period_of(end_date)
+
+        return start_period, end_period
+
+    def apply(self, changes):
+        """
+        Apply expense changes to the rollups
+        changes is a list of (expense_dict, sign) where sign is 1 for an
+        added expense and -1 for a removed one
+        """
+        increments = {}
+        usage = {}
+        for expense, sign in changes:
+            category_key = (expense['category_id'], expense['user_id'])
+            usage[category_key] = usage.get(category_key, 0) + sign
+
+            # Expenses without a valid date can't be placed in a month
+            if not isinstance(expense.get('date'), datetime):
+                continue
+
+            key = (
+                expense['user_id'],
+                self.period_of(expense['date']),
+                expense['category_id'],
+                expense.get('payment_method')
+            )
+            total, count = increments.get(key, (0, 0))
+            increments[key] = (total + sign * float(expense['amount']), count + sign)
+
+        operations = [
+            UpdateOne(
+                {'user_id': user_id, 'period': period, 'category_id': category_id,
+                 'payment_method': payment_method},
+                {'$inc': {'total': total, 'count': count}},
+                upsert=True
+            )
+            for (user_id, period, category_id, payment_method), (total, count) in increments.items()
+            if count != 0 or total != 0
+        ]
+
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+        usage_operations = [
+            UpdateOne({'_id': category_id}, {'$inc': {'count': count}, '$setOnInsert': {'user_id': user_id}},
+                      upsert=True)
+            for (category_id, user_id), count in usage.items() if count != 0
+        ]
+
+        if usage_operations:
+            self.usage.bulk_write(usage_operations, ordered=False)
+
+    def add(self, expense):
+        """Add a newly created expense to the rollups"""
+        self.apply([(expense, 1)])
+
+    def remove(self, expense):
+        """Remove a deleted expense from the rollups"""
+        self.apply([(expense, -1)])
+
+    def move(self, old_expense, new_expense):
+        """Move an edited expense from its old rollup to its new one"""
+        self.apply([(old_expense, -1), (new_expense, 1)])
+
+    def usage_count(self, category_id):
+        """Return the number of expenses in a category, or None if it has no counter yet"""
+        if isinstance(category_id, str):
+            category_id = ObjectId(category_id)
+
+        document = self.usage.find_one({'_id': category_id}, {'count': 1})
+        return document['count'] if document else None
+
+    def usage_complete(self):
+        """
+        Whether the counters were rebuilt from all expenses, after which every
+        write keeps them exact and a missing or zero counter means no expenses
+        """
+        if not ExpenseRollupHandler._usage_complete:
+            ExpenseRollupHandler._usage_complete = self.state.find_one({'_id': 'category_usage'}) is not None
+        return ExpenseRollupHandler._usage_complete
+
+    def remove_usage(self, category_id):
+        """Remove the expense counter of a deleted category"""
+        if isinstance(category_id, str):
+            category_id = ObjectId(category_id)
+
+        self.usage.delete_one({'_id': category_id})
+
+    def move_category(self, user_id, source_id, target_id, count):
+        """
+        Move a user's rollups of a category to another one, and count expenses
+        from the first to the second, after those expenses were reassigned
+        """
+        query = {'user_id': user_id, 'category_id': source_id}
+        operations = [
+            UpdateOne(
+                {'user_id': rollup['user_id'], 'period': rollup['period'], 'category_id': target_id,
+                 'payment_method': rollup.get('payment_method')},
+                {'$inc': {'total': rollup['total'], 'count': rollup['count']}},
+                upsert=True
+            )
+            for rollup in self.collection.find(query)
+        ]
+
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+            self.collection.delete_many(query)
+
+        if count:
+            self.usage.bulk_write([
+                UpdateOne({'_id': source_id}, {'$inc': {'count': -count}}),
+                UpdateOne({'_id': target_id}, {'$inc': {'count': count}, '$setOnInsert': {'user_id': user_id}},
+                          upsert=True)
+            ], ordered=False)
+
+        # The counter of an emptied category goes, other users' expenses keep it
+        self.usage.delete_one({'_id': source_id, 'count': {'$lte': 0}})
+
+    def _match_query(self, user_id, start_period=None, end_period=None):
+        """Build the match query for a user's rollups within a period range"""
+        if isinstance(user_id, str):
+            user_id = ObjectId(user_id)
+
+        match_query = {'user_id': user_id}
+        if start_period or end_period:
+            period_query = {}
+            if start_period:
+                period_query['$gte'] = start_period
+            if end_period:
+                period_query['$lte'] = end_period
+            match_query['period'] = period_query
+
+        return match_query
+
+    def _summary_pipeline(self, match_query, group_by, sort, extra_stages=None):
+        """Build the pipeline summing the rollups matching match_query grouped by the given field"""
+        return [
+            {'$match': match_query},
+            {'$group': {
+                '_id': group_by,
+                'total': {'$sum': '$total'},
+                'count': {'$sum': '$count'}
+            }},
+            # Drop groups whose expenses have all been removed
+            {'$match': {'count': {'$gt': 0}}},
+            {'$sort': sort}
+        ] + (extra_stages or [])
+
+    def category_summary_pipeline(self, user_id, start_period=None, end_period=None,
+                                  expand_category=False):
+        """Pipeline behind summary_by_category, also run by the async handlers"""
+        match_query = self._match_query(user_id, start_period, end_period)
+        extra_stages = category_lookup_stages('_id') if expand_category else None
+        return self._summary_pipeline(match_query, '$category_id', {'total': -1}, extra_stages)
+
+    def payment_method_summary_pipeline(self, user_id, start_period=None, end_period=None):
+        """Pipeline behind summary_by_payment_method, also run by the async handlers"""
+        match_query = self._match_query(user_id, start_period, end_period)
+        return self._summary_pipeline(match_query, '$payment_method', {'total': -1})
+
+    def month_summary_pipeline(self, user_id, year):
+        """Pipeline behind summary_by_month, its result goes through month_numbers"""
+        match_query = self._match_query(user_id, f'{year:04d}-01', f'{year:04d}-12')
+        return self._summary_pipeline(match_query, '$period', {'_id': 1})
+
+    @staticmethod
+    def month_numbers(result):
+        """Replace the YYYY-MM period of month summary groups by the month number"""
+        for item in result:
+            item['_id'] = int(item['_id'][5:])
+        return result
+
+    def summary_by_category(self, user_id, start_period=None, end_period=None, expand_category=False):
+        """
+        Get a summary of expenses grouped by category from the rollups
+        With expand_category each group also gets the category's name, color and icon
+        """
+        pipeline = self.category_summary_pipeline(user_id, start_period, end_period, expand_category)
+        return list(self.collection.aggregate(pipeline))
+
+    def summary_by_payment_method(self, user_id, start_period=None, end_period=None):
+        """Get a summary of expenses grouped by payment method from the rollups"""
+        pipeline = self.payment_method_summary_pipeline(user_id, start_period, end_period)
+        return list(self.collection.aggregate(pipeline))
+
+    def summary_by_month(self, user_id, year):
+        """
+        Get a summary of expenses grouped by month for a year from the rollups
+        Months are returned as numbers, like MongoDB's $month
+        """
+        pipeline = self.month_summary_pipeline(user_id, year)
+        return self.month_numbers(list(self.collection.aggregate(pipeline)))
+
+    def rebuild(self, user_id=None):
+        """
+        Recompute the rollups and category expense counts from the expenses
+        collection, for one user or all users
+        Returns the number of rollup documents written
+        """
+        match_query = {'date': {'$type': 'date'}}
+        if user_id:
+            if isinstance(user_id, str):
+                user_id = ObjectId(user_id)
+            match_query['user_id'] = user_id
+
+        self.rebuild_usage(user_id)
+
+        pipeline = [
+            {'$match': match_query},
+            {'$group': {
+                '_id': {
+                    'user_id': '$user_id',
+                    'period': {'$dateToString': {'format': '%Y-%m', 'date': '$date'}},
+                    'category_id': '$category_id',
+                    'payment_method': '$payment_method'
+                },
+                'total': {'$sum': '$amount'},
+                'count': {'$sum': 1}
+            }}
+        ]
+
+        # Replace the existing rollups, writing the new ones in batches
+        self.collection.delete_many({'user_id': user_id} if user_id else {})
+
+        written = 0
+        batch = []
+        for item in self.db.expenses.aggregate(pipeline, allowDiskUse=True):
+            batch.append({**item['_id'], 'total': item['total'], 'count': item['count']})
+            if len(batch) >= 1000:
+                self.collection.insert_many(batch, ordered=False)
+                written += len(batch)
+                batch = []
+
+        if batch:
+            self.collection.insert_many(batch, ordered=False)
+            written += len(batch)
+
+        return written
+
+    def rebuild_usage(self, user_id=None):
+        """Recompute the expense count of every category, for one user or all users"""
+        pipeline = [
+            {'$match': {'user_id': user_id} if user_id else {}},
+            {'$group': {'_id': '$category_id', 'user_id': {'$first': '$user_id'}, 'count': {'$sum': 1}}}
+        ]
+
+        self.usage.delete_many({'user_id': user_id} if user_id else {})
+
+        batch = []
+        for item in self.db.expenses.aggregate(pipeline, allowDiskUse=True):
+            batch.append(item)
+            if len(batch) >= 1000:
+                self.usage.insert_many(batch, ordered=False)
+                batch = []
+
+        if batch:
+            self.usage.insert_many(batch, ordered=False)
+
+        # Counters of all users now match the expenses, see usage_complete
+        if not user_id:
+            self.state.update_one({'_id': 'category_usage'}, {'$set': {'rebuilt_at': datetime.utcnow()}},
+                                  upsert=True)
@@ -1,28 +1,66 @@
 # models/user.py
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.passwords import hash_password, verify_password
 from bson import ObjectId
+from types import MappingProxyType
+
+# Shared read-only `extra` for documents without additional fields
+NO_EXTRA = MappingProxyType({})
 
 class User:
     """
     User model for MongoDB
     """
     
+    # Slots keep per-instance memory down when materializing large pages,
+    # fields not listed here are kept in `extra`
+    __slots__ = ('_id', 'username', 'email', 'password_hash', 'first_name', 'last_name',
+                 'created_at', 'extra')
+    
+    fields = frozenset(__slots__) - {'extra'}
+    
     required_fields = ['username', 'email', 'password']
     
     def __init__(self, username, email, password=None, first_name=None, 
-                 last_name=None, created_at=None, _id=None, **kwargs):
+                 last_name=None, created_at=None, _id=None, password_hash=None, **kwargs):
         self._id = _id or ObjectId()
         self.username = username
         self.email = email
-        self.password_hash = generate_password_hash(password) if password else None
+        self.password_hash = hash_password(password) if password else password_hash
         self.first_name = first_name
         self.last_name = last_name
         self.created_at = created_at or datetime.utcnow()
         
         # Add any additional fields from kwargs
-        for key, value in kwargs.items():
-            setattr(self, key, value)
+        self.extra = kwargs
+    
+    def __getattr__(self, name):
+        # Only called for names that aren't slots, look them up in the additional fields
+        try:
+            return object.__getattribute__(self, 'extra')[name]
+        except (AttributeError, KeyError):
+            raise AttributeError(f"'User' object has no attribute '{name}'") from None
+    
+    @classmethod
+    def from_bson(cls, data):
+        """
+        Create a User instance from a document read from MongoDB.
+        The document's types are trusted as stored, so no conversion or
+        validation is done. The document is not modified.
+        """
+        user = cls.__new__(cls)
+        user._id = data.get('_id')
+        user.username = data.get('username')
+        user.email = data.get('email')
+        user.password_hash = data.get('password_hash')
+        user.first_name = data.get('first_name')
+        user.last_name = data.get('last_name')
+        user.created_at = data.get('created_at')
+        
+        # Keep any additional fields
+        extra_keys = data.keys() - cls.fields
+        user.extra = {key: data[key] for key in extra_keys} if extra_keys else NO_EXTRA
+        return user
     
     @classmethod
     def from_dict(cls, data):
@@ -56,11 +94,11 @@ class User:
         }
         
         # Include password hash only if specifically requested
-        if include_private and hasattr(self, 'password_hash'):
+        if include_private:
             user_dict['password_hash'] = self.password_hash
             
         # Include any additional attributes that may have been added
-        for key, value in self.__dict__.items():
+        for key, value in self.extra.items():
             if key not in user_dict and not key.startswith('_'):
                 user_dict[key] = value
                 
@@ -69,16 +107,18 @@ class User:
     def check_password(self, password):
         """
         Verify the password against the stored hash
+        Raises PasswordPoolBusy when the hashing pool is saturated
         """
         if not self.password_hash:
             return False
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
     
     def set_password(self, password):
         """
         Set a new password
+        Raises PasswordPoolBusy when the hashing pool is saturated
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
         
     @staticmethod
     def validate(user_data):
@@ -1,114 +1,182 @@
 # Fix for app/models/UserHandler.py
 from app.database import get_db  # Use absolute import path
 from app.models.User import User
+from app.passwords import PasswordPoolBusy, hash_password, needs_rehash
+from app.pagination import count_documents, sort_spec
 from bson import ObjectId
+from flask import current_app
+from pymongo import ReturnDocument
 from pymongo.errors import DuplicateKeyError
 
+# Fields with a unique index, and the error reported when a value is taken
+UNIQUE_FIELDS = {
+    'username': 'Username already exists',
+    'email': 'Email already exists',
+}
+
+def duplicate_key_errors(error, fallback):
+    """
+    Map a DuplicateKeyError to {field: message} for the field whose unique
+    index rejected the write, or to {'error': fallback} when it can't be told
+    """
+    details = error.details or {}
+    fields = list(details.get('keyPattern') or details.get('keyValue') or {})
+    if not fields:
+        # Older servers only name the index in the message
+        fields = [field for field in UNIQUE_FIELDS if f'index: {field}_1 ' in str(error)]
+    
+    errors = {field: UNIQUE_FIELDS[field] for field in fields if field in UNIQUE_FIELDS}
+    return errors or {'error': fallback}
+
 class UserRepository:
     """
     Repository class for handling User document operations in MongoDB
     """
     
-    def __init__(self):
-        self.db = get_db().db  # Access the db attribute of PyMongo instance
-        self.collection = self.db.users  # Use lowercase collection name for consistency
-        
-        # Ensure indexes for performance and constraints
-        self._ensure_indexes()
+    # Fields users can be sorted on, each backed by an index in app/indexes.py
+    SORT_FIELDS = ('username', 'email', 'created_at')
+    
+    @property
+    def db(self):
+        return get_db().db  # Access the db attribute of PyMongo instance
     
-    def _ensure_indexes(self):
-        """Create necessary indexes for the users collection"""
-        # Username and email should be unique
-        self.collection.create_index('username', unique=True)
-        self.collection.create_index('email', unique=True)
+    @property
+    def collection(self):
+        return self.db.users  # Use lowercase collection name for consistency
     
-    def find_by_id(self, user_id):
-        """Find a user by their ID"""
+    def find_by_id(self, user_id, raw=False):
+        """
+        Find a user by their ID
+        With raw=True the document is returned as a plain dict, without the password hash
+        """
         if isinstance(user_id, str):
             user_id = ObjectId(user_id)
+        
+        if raw:
+            return self.collection.find_one({'_id': user_id}, {'password_hash': 0})
             
         user_data = self.collection.find_one({'_id': user_id})
         if user_data:
-            return User.from_dict(user_data)
+            return User.from_bson(user_data)
         return None
     
     def find_by_username(self, username):
         """Find a user by their username"""
         user_data = self.collection.find_one({'username': username})
         if user_data:
-            return User.from_dict(user_data)
+            return User.from_bson(user_data)
         return None
     
     def find_by_email(self, email):
         """Find a user by their email"""
         user_data = self.collection.find_one({'email': email})
         if user_data:
-            return User.from_dict(user_data)
+            return User.from_bson(user_data)
         return None
     
-    def create(self, user_data):
+    def create(self, user_data, session=None):
         """
         Create a new user
         Returns (success, result)
         - If success is True, result is the created User
         - If success is False, result is the error message
+        Taken usernames and emails are reported by the unique indexes
         """
         # Validate user data
         is_valid, errors = User.validate(user_data)
         if not is_valid:
             return False, errors
         
-        # Check if username or email already exists
-        if self.find_by_username(user_data['username']):
-            return False, {'username': 'Username already exists'}
-        
-        if self.find_by_email(user_data['email']):
-            return False, {'email': 'Email already exists'}
-        
         # Create user instance
         user = User(**user_data)
         
         try:
             # Insert into database
-            result = self.collection.insert_one(user.to_dict(include_private=True))
+            result = self.collection.insert_one(user.to_dict(include_private=True), session=session)
             user._id = result.inserted_id
             return True, user
-        except DuplicateKeyError:
-            return False, {'error': 'User with this username or email already exists'}
+        except DuplicateKeyError as e:
+            return False, duplicate_key_errors(e, 'User with this username or email already exists')
         except Exception as e:
             return False, {'error': str(e)}
     
+    def register(self, user_data, category_repo):
+        """
+        Create a new user with the default categories, in two round trips
+        With ONBOARDING_TRANSACTION both inserts run in one transaction,
+        which needs a replica set
+        Returns (success, result) like create
+        """
+        if not current_app.config.get('ONBOARDING_TRANSACTION', False):
+            success, result = self.create(user_data)
+            if success:
+                category_repo.insert_default_categories(result._id)
+            return success, result
+        
+        def onboard(session):
+            success, result = self.create(user_data, session=session)
+            if not success:
+                session.abort_transaction()
+                return success, result
+            
+            category_repo.insert_default_categories(result._id, session=session)
+            return success, result
+        
+        with self.db.client.start_session() as session:
+            return session.with_transaction(onboard)
+    
     def update(self, user_id, update_data):
         """
         Update a user's information
         Returns (success, result)
         """
-        # Remove password from direct updates for security
+        # Store a hash instead of the password
         if 'password' in update_data:
-            # Get the user to update their password properly
-            user = self.find_by_id(user_id)
-            if user:
-                user.set_password(update_data['password'])
-                update_data['password_hash'] = user.password_hash
-            del update_data['password']
+            update_data['password_hash'] = hash_password(update_data.pop('password'))
         
         # Remove _id from updates if present
         update_data.pop('_id', None)
         
         try:
-            result = self.collection.update_one(
+            # Update and get the updated user back, without the password hash
+            user_data = self.collection.find_one_and_update(
                 {'_id': ObjectId(user_id)},
-                {'$set': update_data}
+                {'$set': update_data},
+                projection={'password_hash': 0},
+                return_document=ReturnDocument.AFTER
             )
             
-            if result.modified_count > 0:
-                return True, self.find_by_id(user_id)
-            return False, {'error': 'User not found or no changes made'}
-        except DuplicateKeyError:
-            return False, {'error': 'Username or email already exists'}
+            if user_data:
+                return True, User.from_bson(user_data)
+            return False, {'error': 'User not found'}
+        except DuplicateKeyError as e:
+            return False, duplicate_key_errors(e, 'Username or email already exists')
         except Exception as e:
             return False, {'error': str(e)}
     
+    def upgrade_password_hash(self, user, password):
+        """
+        Rehash a just verified password when its stored hash was made with
+        outdated parameters. Skipped when the hashing pool is busy, the next
+        login will try again.
+        Returns whether the hash was replaced
+        """
+        if not needs_rehash(user.password_hash):
+            return False
+        
+        old_hash = user.password_hash
+        try:
+            user.set_password(password)
+        except PasswordPoolBusy:
+            return False
+        
+        # Only replace the hash we verified, in case the password changed meanwhile
+        result = self.collection.update_one(
+            {'_id': user._id, 'password_hash': old_hash},
+            {'$set': {'password_hash': user.password_hash}}
+        )
+        return result.modified_count > 0
+    
     def delete(self, user_id):
         """Delete a user by their ID"""
         if isinstance(user_id, str):
@@ -117,21 +185,31 @@ class UserRepository:
         result = self.collection.delete_one({'_id': user_id})
         return result.deleted_count > 0
     
-    def list_all(self, skip=0, limit=20, sort_by='username', sort_dir=1):
-        """List all users with pagination"""
+    def list_all(self, skip=0, limit=20, sort_by='username', sort_dir=1, count='exact', raw=False):
+        """
+        List all users with pagination
+        With raw=True the users are returned as plain dicts
+        Raises ValueError on an invalid count mode or sort
+        """
+        # Only fields backed by a (field, _id) index can be sorted on
+        sort = sort_spec(sort_by, sort_dir, self.SORT_FIELDS)
+        
         cursor = self.collection.find({}, {'password_hash': 0})
         
         # Apply sorting
-        cursor = cursor.sort(sort_by, sort_dir)
+        cursor = cursor.sort(sort)
         
         # Apply pagination
         cursor = cursor.skip(skip).limit(limit)
         
         # Convert to User objects
-        users = [User.from_dict(user_data) for user_data in cursor]
+        if raw:
+            users = list(cursor)
+        else:
+            users = [User.from_bson(user_data) for user_data in cursor]
         
         # Get total count
-        total_count = self.collection.count_documents({})
+        total_count = count_documents(self.collection, {}, count)
         
         return {
             'users': users,
@@ -0,0 +1,340 @@
+# app/monitoring.py - Per-request database instrumentation and Prometheus metrics
+import contextvars
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from pymongo import monitoring
+
+# Bucket upper bounds for durations in seconds and for per-request command counts
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+class Histogram:
+    """
+    Minimal thread-safe Prometheus histogram with labels,
+    rendered in the text exposition format
+    """
+
+    def __init__(self, name, help_text, label_names, buckets=TIME_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """Record one observation for the given label values"""
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        """Return the histogram's lines in the Prometheus text format"""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, (bucket_counts, total, count) in sorted(self._series.items()):
+                labels = ','.join(f'{name}="{_escape(value)}"'
+                                  for name, value in zip(self.label_names, label_values))
+                prefix = labels + ',' if labels else ''
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {bucket_count}')
+                lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+                lines.append(f'{self.name}_sum{{{labels}}} {total}')
+                lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+def _escape(value):
+    """Escape a label value for the text format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Metrics exported on /metrics
+COMMAND_DURATION = Histogram(
+    'mongodb_command_duration_seconds', 'Duration of MongoDB commands.',
+    ('endpoint', 'command', 'status'))
+POOL_WAIT = Histogram(
+    'mongodb_pool_checkout_wait_seconds', 'Time spent waiting to check out a pooled connection.',
+    ('endpoint',))
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Duration of HTTP requests.',
+    ('endpoint', 'method', 'status'))
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_seconds', 'Total MongoDB command time per HTTP request.',
+    ('endpoint',))
+REQUEST_DB_COMMANDS = Histogram(
+    'http_request_db_commands', 'Number of MongoDB commands per HTTP request.',
+    ('endpoint',), buckets=COUNT_BUCKETS)
+
+HISTOGRAMS = [COMMAND_DURATION, POOL_WAIT, REQUEST_DURATION, REQUEST_DB_TIME, REQUEST_DB_COMMANDS]
+
+# Gauges read when /metrics is scraped, as (name, help, callable returning {labels: value})
+_gauges = []
+
+def register_gauge(name, help_text, collect):
+    """
+    Export a gauge on /metrics
+    collect is called on every scrape and returns a dict mapping a tuple of
+    (label name, label value) pairs to the current value
+    """
+    _gauges.append((name, help_text, collect))
+
+# Endpoint, counters and start time of the request being served by the async tier,
+# which has no Flask request context. Each request runs in its own task and context.
+_async_request = contextvars.ContextVar('async_request', default=None)
+
+def _current_endpoint():
+    """Endpoint of the request being handled, or 'none' outside a request"""
+    if has_request_context():
+        return request.endpoint or 'unmatched'
+    state = _async_request.get()
+    if state is not None:
+        return state['endpoint']
+    return 'none'
+
+def _request_stats():
+    """Database counters of the current request, or None outside a request"""
+    if has_request_context():
+        return g.get('db_stats')
+    state = _async_request.get()
+    if state is not None:
+        return state['stats']
+    return None
+
+class CommandTimingListener(monitoring.CommandListener):
+    """Times every MongoDB command and charges it to the current request"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, 'ok')
+
+    def failed(self, event):
+        self._record(event, 'error')
+
+    def _record(self, event, status):
+        duration = event.duration_micros / 1e6
+        COMMAND_DURATION.observe(duration, _current_endpoint(), event.command_name, status)
+
+        stats = _request_stats()
+        if stats is not None:
+            stats['commands'] += 1
+            stats['db_time'] += duration
+
+class PoolStats:
+    """
+    Connection counts of each pool of the process' MongoClients, by client
+    name and server address, so the sync and async clients don't mix
+    """
+
+    def __init__(self):
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, client, address):
+        return self._pools.setdefault((client, address), {'total': 0, 'in_use': 0, 'waiting': 0, 'max_size': 0})
+
+    def add(self, client, address, **deltas):
+        with self._lock:
+            pool = self._pool(client, address)
+            for name, delta in deltas.items():
+                pool[name] += delta
+
+    def set_max_size(self, client, address, max_size):
+        with self._lock:
+            self._pool(client, address)['max_size'] = max_size
+
+    def remove(self, client, address):
+        with self._lock:
+            self._pools.pop((client, address), None)
+
+    def snapshot(self):
+        """Return {(client, address): counts} with the idle connections worked out"""
+        with self._lock:
+            return {key: dict(pool, idle=max(pool['total'] - pool['in_use'], 0))
+                    for key, pool in self._pools.items()}
+
+POOL_STATS = PoolStats()
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    """
+    Keeps the in-use, idle and waiting connection counts of each pool and
+    measures how long each connection checkout waits
+    client names the MongoClient the listener is passed to
+    """
+
+    def __init__(self, client='sync'):
+        self.client = client
+        self._local = threading.local()
+
+    def pool_created(self, event):
+        POOL_STATS.set_max_size(self.client, event.address, event.options.get('maxPoolSize', 0))
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        POOL_STATS.remove(self.client, event.address)
+
+    def connection_created(self, event):
+        POOL_STATS.add(self.client, event.address, total=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        POOL_STATS.add(self.client, event.address, total=-1)
+
+    def connection_check_out_started(self, event):
+        POOL_STATS.add(self.client, event.address, waiting=1)
+        self._local.started_at = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        POOL_STATS.add(self.client, event.address, waiting=-1, in_use=1)
+        self._record_wait(event)
+
+    def connection_check_out_failed(self, event):
+        POOL_STATS.add(self.client, event.address, waiting=-1)
+        self._record_wait(event)
+
+    def connection_checked_in(self, event):
+        POOL_STATS.add(self.client, event.address, in_use=-1)
+
+    def _record_wait(self, event):
+        started_at = getattr(self._local, 'started_at', None)
+        self._local.started_at = None
+
+        # Newer drivers time the checkout themselves, which also holds when
+        # an async client interleaves many checkouts on one thread
+        wait = getattr(event, 'duration', None)
+        if wait is None:
+            if started_at is None:
+                return
+            wait = time.perf_counter() - started_at
+        POOL_WAIT.observe(wait, _current_endpoint())
+
+        stats = _request_stats()
+        if stats is not None:
+            stats['pool_wait'] += wait
+
+def pool_stats():
+    """Gauge values for the pool connection counts"""
+    return {(('client', client), ('address', f'{host}:{port}'), ('state', state)): value
+            for (client, (host, port)), pool in POOL_STATS.snapshot().items()
+            for state, value in pool.items()}
+
+register_gauge('mongodb_pool_connections',
+               'Connections of each MongoDB pool by client and state (in_use, idle, waiting, total, max_size), per worker.',
+               pool_stats)
+
+def event_listeners(client='sync'):
+    """Listeners to pass to the MongoClient named client"""
+    return [CommandTimingListener(), PoolListener(client)]
+
+def _new_stats():
+    return {'commands': 0, 'db_time': 0.0, 'pool_wait': 0.0}
+
+def _record_request(endpoint, method, path, status_code, stats, elapsed):
+    """
+    Record a finished request in the request metrics
+    Returns the Server-Timing header value, or None when it is turned off
+    """
+    REQUEST_DURATION.observe(elapsed, endpoint, method, str(status_code))
+    REQUEST_DB_TIME.observe(stats['db_time'], endpoint)
+    REQUEST_DB_COMMANDS.observe(stats['commands'], endpoint)
+
+    # Flag requests that look like they query in a loop
+    threshold = current_app.config.get('DB_COMMANDS_WARN_THRESHOLD')
+    if threshold and stats['commands'] > threshold:
+        current_app.logger.warning('%s %s issued %d MongoDB commands', method, path, stats['commands'])
+
+    if not current_app.config.get('SERVER_TIMING', True):
+        return None
+    return (
+        f'db;dur={stats["db_time"] * 1000:.2f};desc="{stats["commands"]} commands", '
+        f'db-pool;dur={stats["pool_wait"] * 1000:.2f}, '
+        f'app;dur={elapsed * 1000:.2f}'
+    )
+
+def _before_request():
+    g.db_stats = _new_stats()
+    g.request_started_at = time.perf_counter()
+
+def _after_request(response):
+    stats = g.get('db_stats')
+    started_at = g.get('request_started_at')
+    if stats is None or started_at is None:
+        return response
+
+    server_timing = _record_request(_current_endpoint(), request.method, request.path, response.status_code,
+                                    stats, time.perf_counter() - started_at)
+    if server_timing:
+        response.headers['Server-Timing'] = server_timing
+
+    return response
+
+def start_async_request(endpoint):
+    """
+    Start timing a request served by the async tier, charging its MongoDB
+    commands to endpoint, the name of the Flask route it replaces
+    Returns the token to pass to finish_async_request
+    """
+    return _async_request.set({'endpoint': endpoint, 'stats': _new_stats(),
+                               'started_at': time.perf_counter()})
+
+def finish_async_request(token, method, path, status_code):
+    """
+    Record a request started with start_async_request in the same metrics as
+    the Flask routes, needs the app context
+    Returns the Server-Timing header value, or None when it is turned off
+    """
+    state = _async_request.get()
+    _async_request.reset(token)
+    return _record_request(state['endpoint'], method, path, status_code, state['stats'],
+                           time.perf_counter() - state['started_at'])
+
+def render_metrics():
+    """Render all metrics in the Prometheus text format"""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+
+    for name, help_text, collect in _gauges:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+        for labels, value in sorted(collect().items()):
+            label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+            lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+def cache_stats():
+    """Gauge values for the hits, misses and size of the caches"""
+    # Imported here, the repositories depend on the database module which imports this one
+    from app.repositories import get_category_handler, get_expense_handler
+
+    caches = {'category': get_category_handler().cache_stats()}
+    if get_expense_handler().summary_cache is not None:
+        caches['summary'] = get_expense_handler().summary_cache.stats()
+    return {(('cache', cache), ('stat', stat)): value
+            for cache, stats in caches.items()
+            for stat, value in stats.items() if value is not None}
+
+register_gauge('app_cache_stat', 'Hits, misses and size of the caches, per worker.', cache_stats)
+
+def init_monitoring(app):
+    """Time every request and expose the collected metrics on /metrics"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+    @app.route('/metrics')
+    def metrics():
+        return app.response_class(render_metrics(), mimetype='text/plain; version=0.0.4')
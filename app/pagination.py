@@ -0,0 +1,122 @@
+# app/pagination.py - Helpers for paginating list queries
+import base64
+from bson import json_util
+from flask import current_app
+from app.cache import TTLCache
+
+# Supported ways of computing the total for a list response
+COUNT_MODES = ('exact', 'estimate', 'none')
+
+# Cache of recent counts used by the 'estimate' mode
+_count_cache = None
+
+def encode_cursor(sort_by, sort_dir, value, last_id):
+    """
+    Build an opaque cursor token pointing just after the given document.
+    The token carries the sort so it can't be replayed against a different ordering.
+    """
+    payload = json_util.dumps({'s': sort_by, 'd': sort_dir, 'v': value, 'id': last_id})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token, sort_by, sort_dir):
+    """
+    Decode a cursor token created by encode_cursor
+    Returns (value, last_id), raises ValueError if the token is invalid
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        value, last_id = payload['v'], payload['id']
+        cursor_sort = (payload['s'], payload['d'])
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+    if cursor_sort != (sort_by, sort_dir):
+        raise ValueError('Cursor does not match the requested sort order')
+
+    return value, last_id
+
+def seek_query(sort_by, sort_dir, value, last_id):
+    """
+    Build the query that continues a (sort_by, _id) ordered scan after the cursor position
+    """
+    op = '$lt' if sort_dir < 0 else '$gt'
+    return {'$or': [
+        {sort_by: {op: value}},
+        {sort_by: value, '_id': {op: last_id}}
+    ]}
+
+def sort_spec(sort_by, sort_dir, sort_fields):
+    """
+    Validate a requested sort against the fields an endpoint allows sorting on
+    Returns the sort specification with _id as tie-breaker, raises ValueError
+    on an unsupported field or direction
+    """
+    if sort_by not in sort_fields:
+        raise ValueError(f"sort_by must be one of: {', '.join(sort_fields)}")
+    if sort_dir not in (1, -1):
+        raise ValueError('sort_dir must be 1 or -1')
+    
+    return [(sort_by, sort_dir), ('_id', sort_dir)]
+
+def count_documents(collection, query, mode='exact'):
+    """
+    Count the documents matching query using the given count mode:
+    - exact: run count_documents
+    - estimate: use collection metadata for unfiltered queries, otherwise a
+      count cached for COUNT_CACHE_TTL seconds
+    - none: skip counting and return None
+    """
+    if mode not in COUNT_MODES:
+        raise ValueError(f"count must be one of: {', '.join(COUNT_MODES)}")
+
+    if mode == 'none':
+        return None
+
+    if mode == 'exact':
+        return collection.count_documents(query)
+
+    # Unfiltered counts come straight from the collection metadata
+    if not query:
+        return collection.estimated_document_count()
+
+    key = _count_key(collection, query)
+    total = _get_count_cache().get(key)
+    if total is None:
+        total = collection.count_documents(query)
+        _get_count_cache().set(key, total)
+    return total
+
+async def count_documents_async(collection, query, mode='exact'):
+    """count_documents for an async collection, sharing the cache of estimated counts"""
+    if mode not in COUNT_MODES:
+        raise ValueError(f"count must be one of: {', '.join(COUNT_MODES)}")
+
+    if mode == 'none':
+        return None
+
+    if mode == 'exact':
+        return await collection.count_documents(query)
+
+    if not query:
+        return await collection.estimated_document_count()
+
+    key = _count_key(collection, query)
+    total = _get_count_cache().get(key)
+    if total is None:
+        total = await collection.count_documents(query)
+        _get_count_cache().set(key, total)
+    return total
+
+def _count_key(collection, query):
+    return (collection.full_name, json_util.dumps(query, sort_keys=True))
+
+def _get_count_cache():
+    """Return the cache of estimated counts, created from the app config on first use"""
+    global _count_cache
+    if _count_cache is None:
+        _count_cache = TTLCache(
+            maxsize=current_app.config.get('COUNT_CACHE_SIZE', 10000),
+            ttl=current_app.config.get('COUNT_CACHE_TTL', 60)
+        )
+    return _count_cache
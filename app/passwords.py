@@ -0,0 +1,115 @@
+# app/passwords.py - Password hashing offloaded to a bounded process pool
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+class PasswordPoolBusy(Exception):
+    """Raised when too many hashes are pending, routes answer it with 503"""
+
+# Settings from the app config, see init_passwords
+settings = {
+    'method': 'pbkdf2:sha256:260000',
+    'salt_length': 16,
+    'workers': 0,
+    'max_pending': 32,
+    'timeout': 5,
+}
+
+# Pool of the current process, created on first use so each forked worker gets its own
+_executor = None
+_executor_pid = None
+_slots = None
+_lock = threading.Lock()
+
+def _pool():
+    """Return the process pool and the semaphore bounding its pending hashes"""
+    global _executor, _executor_pid, _slots
+    with _lock:
+        if _executor_pid != os.getpid():
+            # Hash processes are started from a clean server process rather than
+            # forked from this one, which may hold other threads' locks
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _executor = ProcessPoolExecutor(settings['workers'],
+                                            mp_context=multiprocessing.get_context(start_method))
+            _executor_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(settings['max_pending'])
+        return _executor, _slots
+
+def _run(function, *args):
+    """
+    Run function in the pool and wait for its result
+    Raises PasswordPoolBusy when max_pending hashes are already queued or
+    running, or when the result doesn't come back within the timeout
+    """
+    if not settings['workers']:
+        return function(*args)
+
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        raise PasswordPoolBusy('Too many password operations in progress')
+
+    try:
+        future = executor.submit(function, *args)
+    except BrokenProcessPool:
+        slots.release()
+        shutdown_pool()
+        raise PasswordPoolBusy('Password hashing pool restarted') from None
+    except BaseException:
+        slots.release()
+        raise
+
+    # Free the slot once the hash is actually done, even if we stop waiting for it
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(settings['timeout'])
+    except TimeoutError:
+        raise PasswordPoolBusy('Password operation timed out') from None
+    except BrokenProcessPool:
+        # A hash process died, start a new pool on the next call
+        shutdown_pool()
+        raise PasswordPoolBusy('Password hashing pool restarted') from None
+
+def hash_password(password):
+    """Hash a password with the configured method"""
+    return _run(generate_password_hash, password, settings['method'], settings['salt_length'])
+
+def verify_password(password_hash, password):
+    """Check a password against a stored hash"""
+    return _run(check_password_hash, password_hash, password)
+
+def needs_rehash(password_hash):
+    """Whether a stored hash was made with other parameters than the configured method"""
+    if not password_hash:
+        return False
+
+    method = settings['method']
+    # Werkzeug adds the default iteration count to pbkdf2 methods that don't set one
+    if method.startswith('pbkdf2:') and method.count(':') == 1:
+        method = f'{method}:{DEFAULT_PBKDF2_ITERATIONS}'
+    return password_hash.split('$', 1)[0] != method
+
+def shutdown_pool():
+    """Stop the current process' hash processes"""
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _executor_pid = None
+
+def init_passwords(app):
+    """
+    Take the hashing settings from the PASSWORD_HASH_* config
+    With PASSWORD_HASH_WORKERS set to 0 hashing runs in the calling thread
+    """
+    settings.update(
+        method=app.config.get('PASSWORD_HASH_METHOD', settings['method']),
+        salt_length=app.config.get('PASSWORD_SALT_LENGTH', settings['salt_length']),
+        workers=app.config.get('PASSWORD_HASH_WORKERS', settings['workers']),
+        max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING', settings['max_pending']),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT', settings['timeout']),
+    )
+    shutdown_pool()
@@ -0,0 +1,44 @@
+# app/repositories.py - Repository instances shared by all routes
+from app.models.ExpenseHandler import ExpenseHandler
+from app.models.CategoryHandler import CategoryHandler
+from app.models.UserHandler import UserRepository
+from app.models.DataVersionHandler import DataVersionHandler
+
+# Shared instances, created by init_repositories
+_expense_handler = None
+_category_handler = None
+_user_repository = None
+_data_version_handler = None
+
+def init_repositories(app):
+    """Create one instance of each repository for the app"""
+    global _expense_handler, _category_handler, _user_repository, _data_version_handler
+    with app.app_context():
+        _expense_handler = ExpenseHandler()
+        _category_handler = CategoryHandler()
+        _user_repository = UserRepository()
+        _data_version_handler = DataVersionHandler()
+
+def get_expense_handler():
+    """Return the shared ExpenseHandler"""
+    if _expense_handler is None:
+        raise RuntimeError("Repositories not initialized. Call init_repositories first.")
+    return _expense_handler
+
+def get_category_handler():
+    """Return the shared CategoryHandler"""
+    if _category_handler is None:
+        raise RuntimeError("Repositories not initialized. Call init_repositories first.")
+    return _category_handler
+
+def get_user_repository():
+    """Return the shared UserRepository"""
+    if _user_repository is None:
+        raise RuntimeError("Repositories not initialized. Call init_repositories first.")
+    return _user_repository
+
+def get_data_version_handler():
+    """Return the shared DataVersionHandler"""
+    if _data_version_handler is None:
+        raise RuntimeError("Repositories not initialized. Call init_repositories first.")
+    return _data_version_handler
@@ -0,0 +1,230 @@
+# routes/AsyncRoutes.py - Read-heavy API routes served by the async tier (see asgi.py)
+from datetime import datetime
+from functools import wraps
+from bson.errors import InvalidId
+from starlette.responses import Response
+from starlette.routing import Route
+from app.conditional import make_etag
+from app.monitoring import finish_async_request, start_async_request
+from app.models.AsyncCategoryHandler import AsyncCategoryHandler
+from app.models.AsyncExpenseHandler import AsyncExpenseHandler
+from app.repositories import get_category_handler, get_expense_handler
+from app.routes.DashboardRoutes import parse_dashboard_limit
+from app.routes.ExpenseRoutes import parse_date
+from app.serialization import dumps
+
+# Flask app whose config and JSON settings the routes run with
+flask_app = None
+
+# Create repository instances
+expense_repo = None
+category_repo = None
+
+# Routes registered with @route, as Starlette routes
+routes = []
+
+def init_async_routes(app):
+    """
+    Initialize the async routes with the Flask app
+    Returns the Starlette routes to mount in front of it
+    """
+    global flask_app, expense_repo, category_repo
+    flask_app = app
+    # Async handlers built on the repositories shared by the sync routes
+    expense_repo = AsyncExpenseHandler(get_expense_handler())
+    category_repo = AsyncCategoryHandler(get_category_handler())
+
+    return list(routes)
+
+def route(path, endpoint, etag_parts=None):
+    """
+    Register an async GET route taking a user_id
+    endpoint is the name of the Flask route it replaces, so both tiers
+    produce the same ETags. With etag_parts the response gets an ETag from
+    the user's data version like @etag_by_data_version, etag_parts being the
+    callables whose results are added to it.
+    Invalid parameters and ids are answered with 400.
+    Requests are timed under endpoint in the same metrics as the Flask routes.
+    """
+    def decorator(view):
+        async def respond(request, user_id):
+            try:
+                etag = None
+                if etag_parts is not None:
+                    version = await expense_repo.versions.get(user_id)
+                    etag = make_etag(endpoint, user_id, version, request.query_params.multi_items(),
+                                     *(part() for part in etag_parts))
+                    if _matches(request, etag):
+                        return _not_modified(etag)
+
+                body = dumps(await view(request, user_id)) + b'\n'
+            except (ValueError, InvalidId) as e:
+                return json_response({'error': str(e)}, 400)
+
+            response = Response(body, media_type='application/json')
+            if etag:
+                response.headers['ETag'] = f'"{etag}"'
+                response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+
+        @wraps(view)
+        async def endpoint_view(request):
+            # Run with the app context so handlers see the app config
+            with flask_app.app_context():
+                token = start_async_request(endpoint)
+                try:
+                    response = await respond(request, request.path_params['user_id'])
+                except BaseException:
+                    # Counted like a Flask route's unhandled error
+                    finish_async_request(token, request.method, request.url.path, 500)
+                    raise
+
+                server_timing = finish_async_request(token, request.method, request.url.path,
+                                                     response.status_code)
+                if server_timing:
+                    response.headers['Server-Timing'] = server_timing
+                return response
+
+        routes.append(Route(path, endpoint_view, methods=['GET'], name=endpoint))
+        return view
+    return decorator
+
+def json_response(data, status_code=200):
+    """JSON response encoded like app.serialization.jsonify"""
+    with flask_app.app_context():
+        return Response(dumps(data) + b'\n', status_code=status_code, media_type='application/json')
+
+def _matches(request, etag):
+    """Whether If-None-Match lists etag, weak or not, or is *"""
+    header = request.headers.get('if-none-match', '').strip()
+    if header == '*':
+        return True
+    return etag in {tag.strip().removeprefix('W/').strip('"') for tag in header.split(',')}
+
+def _not_modified(etag):
+    return Response(status_code=304, headers={'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'})
+
+def wants_expand(request, name):
+    return name in request.query_params.get('expand', '').split(',')
+
+# Route to get all the data the dashboard needs in one request
+@route('/api/dashboard/{user_id}', 'dashboard.get_dashboard_data')
+async def get_dashboard_data(request, user_id):
+    # Parse query parameters
+    limit = parse_dashboard_limit(request.query_params.get('limit', 100))
+
+    # Parse date filters
+    start_date = parse_date(request.query_params.get('start_date', None))
+    end_date = parse_date(request.query_params.get('end_date', None))
+
+    # Parse year filter for the monthly summary
+    year = request.query_params.get('year', None)
+    if year:
+        year = int(year)
+
+    # Get categories and expense data
+    categories = await category_repo.find_by_user(user_id, count='none')
+    result = await expense_repo.get_dashboard_summary(user_id, start_date, end_date, year, limit)
+
+    return {
+        'categories': categories['categories'],
+        'expenses': result['expenses'],
+        'stats': {
+            'total': result['total'],
+            'count': result['count'],
+            'average': result['total'] / result['count'] if result['count'] else 0
+        },
+        'summary': {
+            'category': result['by_category'],
+            'month': result['by_month'],
+            'payment_method': result['by_payment_method']
+        }
+    }
+
+# Route to get all expenses for a user with filtering
+@route('/api/expenses/user/{user_id}', 'expenses.get_user_expenses')
+async def get_user_expenses(request, user_id):
+    # Parse query parameters
+    skip = int(request.query_params.get('skip', 0))
+    limit = int(request.query_params.get('limit', 50))
+    sort_by = request.query_params.get('sort_by', 'date')
+    sort_dir = int(request.query_params.get('sort_dir', -1))  # -1 for descending (newest first)
+
+    # Parse date filters
+    start_date = parse_date(request.query_params.get('start_date', None))
+    end_date = parse_date(request.query_params.get('end_date', None))
+
+    # Parse category filter, cursor and count mode
+    category_id = request.query_params.get('category_id', None)
+    after = request.query_params.get('after', None)
+    count = request.query_params.get('count', 'exact')
+
+    result = await expense_repo.find_by_user(
+        user_id, skip, limit, sort_by, sort_dir,
+        start_date, end_date, category_id, after, count, wants_expand(request, 'category')
+    )
+
+    return {
+        'expenses': result['expenses'],
+        'total': result['total'],
+        'skip': result['skip'],
+        'limit': result['limit'],
+        'next_cursor': result['next_cursor']
+    }
+
+# Route to get all categories for a user
+@route('/api/categories/user/{user_id}', 'categories.get_user_categories', etag_parts=())
+async def get_user_categories(request, user_id):
+    # Parse query parameters
+    skip = int(request.query_params.get('skip', 0))
+    limit = int(request.query_params.get('limit', 100))
+    sort_by = request.query_params.get('sort_by', 'name')
+    sort_dir = int(request.query_params.get('sort_dir', 1))  # 1 for ascending
+    count = request.query_params.get('count', 'exact')  # exact, estimate or none
+
+    result = await category_repo.find_by_user(user_id, skip, limit, sort_by, sort_dir, count)
+
+    return {
+        'categories': result['categories'],
+        'total': result['total'],
+        'skip': result['skip'],
+        'limit': result['limit']
+    }
+
+# Route to get expense summary by category
+@route('/api/expenses/summary/category/{user_id}', 'expenses.get_category_summary', etag_parts=())
+async def get_category_summary(request, user_id):
+    # Parse date filters
+    start_date = parse_date(request.query_params.get('start_date', None))
+    end_date = parse_date(request.query_params.get('end_date', None))
+
+    result = await expense_repo.get_summary_by_category(
+        user_id, start_date, end_date, wants_expand(request, 'category')
+    )
+
+    return {'summary': result}
+
+# Route to get expense summary by month
+@route('/api/expenses/summary/month/{user_id}', 'expenses.get_month_summary',
+       etag_parts=(lambda: datetime.utcnow().year,))  # the default year
+async def get_month_summary(request, user_id):
+    # Parse year filter
+    year = request.query_params.get('year', None)
+    if year:
+        year = int(year)
+
+    result = await expense_repo.get_summary_by_month(user_id, year)
+
+    return {'summary': result}
+
+# Route to get expense summary by payment method
+@route('/api/expenses/summary/payment-method/{user_id}', 'expenses.get_payment_method_summary',
+       etag_parts=())
+async def get_payment_method_summary(request, user_id):
+    # Parse date filters
+    start_date = parse_date(request.query_params.get('start_date', None))
+    end_date = parse_date(request.query_params.get('end_date', None))
+
+    result = await expense_repo.get_summary_by_payment_method(user_id, start_date, end_date)
+
+    return {'summary': result}
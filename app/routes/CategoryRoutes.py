@@ -1,8 +1,10 @@
 # routes/CategoryRoutes.py
-from flask import Blueprint, request, jsonify
-from app.models.CategoryHandler import CategoryHandler
-from app.models.ExpenseHandler import ExpenseHandler
+from flask import Blueprint, request
+from app.serialization import jsonify
+from app.repositories import get_category_handler, get_expense_handler
 from app.models.Category import Category
+from app.conditional import etag_by_data_version
+from app.pagination import count_documents, sort_spec
 from bson.objectid import ObjectId
 
 # Create Blueprint
@@ -15,10 +17,9 @@ expense_repo = None
 def init_category_routes(app, mongo):
     """Initialize category routes with application context"""
     global category_repo, expense_repo
-    # Initialize repositories with the database connection
-    with app.app_context():
-        category_repo = CategoryHandler()
-        expense_repo = ExpenseHandler()
+    # Use the repositories shared by all routes
+    category_repo = get_category_handler()
+    expense_repo = get_expense_handler()
     
     # Register the blueprint with the app
     app.register_blueprint(category_bp)
@@ -26,28 +27,23 @@ def init_category_routes(app, mongo):
 
 # Route to get all categories for a user
 @category_bp.route('/user/<user_id>', methods=['GET'])
+@etag_by_data_version()
 def get_user_categories(user_id):
     # Parse query parameters
     skip = int(request.args.get('skip', 0))
     limit = int(request.args.get('limit', 100))
     sort_by = request.args.get('sort_by', 'name')
     sort_dir = int(request.args.get('sort_dir', 1))  # 1 for ascending
+    count = request.args.get('count', 'exact')  # exact, estimate or none
     
     # Get categories with pagination
-    result = category_repo.find_by_user(user_id, skip, limit, sort_by, sort_dir)
-    
-    # Convert categories to dict for JSON serialization
-    categories_dict = []
-    for category in result['categories']:
-        category_dict = category.to_dict()
-        category_dict['_id'] = str(category_dict['_id'])
-        if 'user_id' in category_dict and category_dict['user_id']:
-            category_dict['user_id'] = str(category_dict['user_id'])
-        category_dict['created_at'] = category_dict['created_at'].isoformat()
-        categories_dict.append(category_dict)
+    try:
+        result = category_repo.find_by_user(user_id, skip, limit, sort_by, sort_dir, count, raw=True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'categories': categories_dict,
+        'categories': result['categories'],
         'total': result['total'],
         'skip': result['skip'],
         'limit': result['limit']
@@ -70,12 +66,6 @@ def create_category():
     if success:
         # Convert category to dict
         category_dict = result.to_dict()
-        # Convert ObjectId to string for JSON serialization
-        category_dict['_id'] = str(category_dict['_id'])
-        if 'user_id' in category_dict and category_dict['user_id']:
-            category_dict['user_id'] = str(category_dict['user_id'])
-        category_dict['created_at'] = category_dict['created_at'].isoformat()
-        
         return jsonify({'category': category_dict, 'message': 'Category created successfully'}), 201
     else:
         # Return validation errors
@@ -89,32 +79,26 @@ def get_all_categories():
     limit = int(request.args.get('limit', 100))
     sort_by = request.args.get('sort_by', 'name')
     sort_dir = int(request.args.get('sort_dir', 1))  # 1 for ascending
+    count = request.args.get('count', 'exact')  # exact, estimate or none
+    
+    # Get total count
+    try:
+        sort = sort_spec(sort_by, sort_dir, category_repo.SORT_FIELDS)
+        total_count = count_documents(category_repo.collection, {}, count)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     # Query for all categories without user filter
     cursor = category_repo.collection.find()
     
     # Apply sorting
-    cursor = cursor.sort(sort_by, sort_dir)
+    cursor = cursor.sort(sort)
     
     # Apply pagination
-    total_count = category_repo.collection.count_documents({})
     cursor = cursor.skip(skip).limit(limit)
     
-    # Convert to Category objects
-    categories = [Category.from_dict(category_data) for category_data in cursor]
-    
-    # Convert categories to dict for JSON serialization
-    categories_dict = []
-    for category in categories:
-        category_dict = category.to_dict()
-        category_dict['_id'] = str(category_dict['_id'])
-        if 'user_id' in category_dict and category_dict['user_id']:
-            category_dict['user_id'] = str(category_dict['user_id'])
-        category_dict['created_at'] = category_dict['created_at'].isoformat()
-        categories_dict.append(category_dict)
-    
     return jsonify({
-        'categories': categories_dict,
+        'categories': list(cursor),
         'total': total_count,
         'skip': skip,
         'limit': limit
@@ -127,11 +111,6 @@ def get_category(category_id):
     
     if category:
         category_dict = category.to_dict()
-        category_dict['_id'] = str(category_dict['_id'])
-        if 'user_id' in category_dict and category_dict['user_id']:
-            category_dict['user_id'] = str(category_dict['user_id'])
-        category_dict['created_at'] = category_dict['created_at'].isoformat()
-        
         return jsonify({'category': category_dict})
     
     return jsonify({'error': 'Category not found'}), 404
@@ -146,11 +125,6 @@ def update_category(category_id):
     
     if success:
         category_dict = result.to_dict()
-        category_dict['_id'] = str(category_dict['_id'])
-        if 'user_id' in category_dict and category_dict['user_id']:
-            category_dict['user_id'] = str(category_dict['user_id'])
-        category_dict['created_at'] = category_dict['created_at'].isoformat()
-        
         return jsonify({'category': category_dict, 'message': 'Category updated successfully'})
     else:
         return jsonify({'errors': result}), 400
@@ -158,18 +132,8 @@ def update_category(category_id):
 # Route to delete a category
 @category_bp.route('/<category_id>', methods=['DELETE'])
 def delete_category(category_id):
-    # First check if there are any expenses with this category
-    # You may want to implement a find_by_category method in ExpenseRepository
-    # For now we'll query directly
-    
-    # Check for any expenses with this category
-    expenses_with_category = expense_repo.find_by_user(
-        user_id=None,  # Not filtering by user
-        category_id=category_id,
-        limit=1  # Just need to know if any exist
-    )
-    
-    if expenses_with_category['total'] > 0:
+    # Check for any expenses with this category, from its expense counter
+    if expense_repo.category_in_use(category_id):
         return jsonify({
             'error': 'Cannot delete category because it has associated expenses. ' +
                     'Please reassign or delete these expenses first.'
@@ -183,6 +147,37 @@ def delete_category(category_id):
     
     return jsonify({'error': 'Category not found or could not be deleted'}), 404
 
+# Route to merge a category into another one of the same user
+@category_bp.route('/<category_id>/merge-into/<target_id>', methods=['POST'])
+def merge_category(category_id, target_id):
+    if category_id == target_id:
+        return jsonify({'error': 'Cannot merge a category into itself'}), 400
+    
+    source = category_repo.find_by_id(category_id)
+    target = category_repo.find_by_id(target_id)
+    if not source or not target:
+        return jsonify({'error': 'Category not found'}), 404
+    
+    if source.user_id is None or source.user_id != target.user_id:
+        return jsonify({'error': 'Only categories of the same user can be merged'}), 400
+    
+    # Move the expenses over, then remove the emptied category
+    moved = expense_repo.reassign_category(source.user_id, source._id, target._id)
+    
+    # Expenses of other users, or added meanwhile, keep the category alive
+    if expense_repo.category_in_use(source._id):
+        return jsonify({
+            'error': f'Moved {moved} expenses, but the category is still in use and was not deleted'
+        }), 409
+    
+    category_repo.delete(source._id)
+    
+    return jsonify({
+        'category': target.to_dict(),
+        'moved': moved,
+        'message': f'Moved {moved} expenses and deleted the category'
+    })
+
 # Route to create default categories for a user
 @category_bp.route('/defaults/<user_id>', methods=['POST'])
 def create_default_categories(user_id):
@@ -1,19 +1,79 @@
 # routes/DashboardRoutes.py
-from flask import Blueprint, render_template
+from flask import Blueprint, current_app, render_template, request
+from app.serialization import jsonify
+from app.repositories import get_expense_handler, get_category_handler
+from app.routes.ExpenseRoutes import parse_date
+from bson.errors import InvalidId
 import datetime
 
 # Create Blueprint
 dashboard_bp = Blueprint('dashboard', __name__)
 
-def init_dashboard_routes(app):
+# Create repository instances
+expense_repo = None
+category_repo = None
+
+def init_dashboard_routes(app, mongo):
     """Initialize dashboard routes with application context"""
+    global expense_repo, category_repo
+    # Use the repositories shared by all routes
+    expense_repo = get_expense_handler()
+    category_repo = get_category_handler()
+
     # Register the blueprint with the app
     app.register_blueprint(dashboard_bp)
 
+# Helper function to parse the number of recent expenses the dashboard returns
+def parse_dashboard_limit(value):
+    limit = int(value)
+    if limit < 0:
+        raise ValueError('limit must not be negative')
+    
+    # 0 means no limit, capped like any other value
+    max_limit = current_app.config.get('MAX_DASHBOARD_EXPENSES', 1000)
+    return min(limit, max_limit) if limit else max_limit
+
 # Dashboard home route
 @dashboard_bp.route('/dashboard')
 def dashboard():
     # Current year for footer copyright
     current_year = datetime.datetime.now().year
-    
-    return render_template('dashboard.html', year=current_year)
\ No newline at end of file
+
+    return render_template('dashboard.html', year=current_year)
+
+# Route to get all the data the dashboard needs in one request
+@dashboard_bp.route('/api/dashboard/<user_id>', methods=['GET'])
+def get_dashboard_data(user_id):
+    try:
+        # Parse query parameters
+        limit = parse_dashboard_limit(request.args.get('limit', 100))
+
+        # Parse date filters
+        start_date = parse_date(request.args.get('start_date', None))
+        end_date = parse_date(request.args.get('end_date', None))
+
+        # Parse year filter for the monthly summary
+        year = request.args.get('year', None)
+        if year:
+            year = int(year)
+
+        # Get categories and expense data
+        categories = category_repo.find_by_user(user_id, count='none', raw=True)
+        result = expense_repo.get_dashboard_summary(user_id, start_date, end_date, year, limit, raw=True)
+    except (ValueError, InvalidId) as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'categories': categories['categories'],
+        'expenses': result['expenses'],
+        'stats': {
+            'total': result['total'],
+            'count': result['count'],
+            'average': result['total'] / result['count'] if result['count'] else 0
+        },
+        'summary': {
+            'category': result['by_category'],
+            'month': result['by_month'],
+            'payment_method': result['by_payment_method']
+        }
+    })
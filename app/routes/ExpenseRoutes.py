@@ -1,8 +1,12 @@
 # routes/ExpenseRoutes.py
-from flask import Blueprint, request, jsonify
-from app.models.ExpenseHandler import ExpenseHandler
+from flask import Blueprint, request, current_app, Response, stream_with_context
+from app.serialization import jsonify, dumps
+from app.repositories import get_expense_handler
+from app.conditional import etag_by_data_version
 from bson.objectid import ObjectId
 from datetime import datetime
+import codecs
+import csv
 import json
 
 # Create Blueprint
@@ -14,9 +18,8 @@ expense_repo = None
 def init_expense_routes(app, mongo):
     """Initialize expense routes with application context"""
     global expense_repo
-    # Initialize repository with the database connection
-    with app.app_context():
-        expense_repo = ExpenseHandler()
+    # Use the repository shared by all routes
+    expense_repo = get_expense_handler()
     
     # Register the blueprint with the app
     app.register_blueprint(expense_bp)
@@ -30,6 +33,93 @@ def parse_date(date_str):
     except ValueError:
         return None
 
+# Helper function to check whether a related document was requested with ?expand=
+def wants_expand(name):
+    return name in request.args.get('expand', '').split(',')
+
+# Helper function to read a JSON array of rows from a stream one element at a time
+def iter_json_array(stream, chunk_size=65536):
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    eof = False
+    # What comes next: the opening bracket, the first element or the closing bracket,
+    # an element, a comma or the closing bracket, or nothing but whitespace
+    expected = 'array'
+    
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+        
+        if position == len(buffer):
+            if eof:
+                if expected == 'end':
+                    return
+                raise ValueError('Invalid or truncated JSON array')
+            data = stream.read(chunk_size)
+            eof = not data
+            buffer = buffer[position:] + text.decode(data, final=eof)
+            position = 0
+            continue
+        
+        char = buffer[position]
+        if expected == 'end':
+            raise ValueError('Unexpected data after the JSON array')
+        
+        if expected == 'array':
+            if char != '[':
+                raise ValueError('Expected a JSON array')
+            expected = 'first'
+            position += 1
+            continue
+        
+        if char == ']' and expected in ('first', 'separator'):
+            expected = 'end'
+            position += 1
+            continue
+        
+        if expected == 'separator':
+            if char != ',':
+                raise ValueError('Expected a comma between array elements')
+            expected = 'element'
+            position += 1
+            continue
+        
+        if char in ',]':
+            raise ValueError('Expected an array element')
+        
+        # An element, read more input unless it was completely decoded
+        try:
+            row, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            end = None
+        
+        if end is None or (end == len(buffer) and not eof):
+            if eof:
+                raise ValueError('Invalid or truncated JSON array')
+            data = stream.read(chunk_size)
+            eof = not data
+            buffer = buffer[position:] + text.decode(data, final=eof)
+            position = 0
+            continue
+        
+        yield row
+        position = end
+        expected = 'separator'
+
+# Helper function to read newline-delimited JSON rows from a stream
+def iter_ndjson(stream):
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # Reported as an invalid row
+            yield None
+
 # Route to create a new expense
 @expense_bp.route('', methods=['POST'])
 def create_expense():
@@ -51,19 +141,102 @@ def create_expense():
     if success:
         # Convert expense to dict
         expense_dict = result.to_dict()
-        # Convert ObjectId and datetime to string for JSON serialization
-        expense_dict['_id'] = str(expense_dict['_id'])
-        expense_dict['category_id'] = str(expense_dict['category_id'])
-        expense_dict['user_id'] = str(expense_dict['user_id'])
-        expense_dict['date'] = expense_dict['date'].isoformat()
-        expense_dict['created_at'] = expense_dict['created_at'].isoformat()
-        expense_dict['updated_at'] = expense_dict['updated_at'].isoformat()
         
         return jsonify({'expense': expense_dict, 'message': 'Expense created successfully'}), 201
     else:
         # Return validation errors
         return jsonify({'errors': result}), 400
 
+# Route to import many expenses from a JSON array or NDJSON body
+@expense_bp.route('/bulk', methods=['POST'])
+def bulk_create_expenses():
+    parse_errors = []
+    
+    def rows():
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            source = iter_ndjson(request.stream)
+        else:
+            source = iter_json_array(request.stream)
+        
+        try:
+            for row in source:
+                # Parse date if provided
+                if isinstance(row, dict) and isinstance(row.get('date'), str):
+                    row['date'] = parse_date(row['date'])
+                yield row
+        except ValueError as e:
+            parse_errors.append(str(e))
+    
+    # Create the expenses
+    result = expense_repo.create_many(
+        rows(), current_app.config.get('BULK_INSERT_CHUNK_SIZE', 1000)
+    )
+    
+    response = {
+        'inserted': result['inserted'],
+        'failed': len(result['errors']),
+        'errors': result['errors']
+    }
+    
+    if parse_errors:
+        # Rows read before the malformed input have still been imported
+        response['error'] = parse_errors[0]
+        return jsonify(response), 400
+    
+    return jsonify(response), 201
+
+# Helper function to read the list a batch request operates on
+def batch_items(key):
+    """
+    Return (items, None) for the list under key in the JSON body,
+    or (None, error response) when it is missing, empty or too long
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({'error': f'{key} must be a non-empty list'}), 400)
+    
+    max_items = current_app.config.get('MAX_BATCH_IDS', 5000)
+    if len(items) > max_items:
+        return None, (jsonify({'error': f'At most {max_items} {key} per request'}), 400)
+    
+    return items, None
+
+# Route to get many expenses by id
+@expense_bp.route('/batch-get', methods=['POST'])
+def batch_get_expenses():
+    ids, error = batch_items('ids')
+    if error:
+        return error
+    
+    return jsonify({'results': expense_repo.find_by_ids(ids)})
+
+# Route to update many expenses by id
+@expense_bp.route('/batch', methods=['PATCH'])
+def batch_update_expenses():
+    updates, error = batch_items('expenses')
+    if error:
+        return error
+    
+    if not all(isinstance(update, dict) for update in updates):
+        return jsonify({'error': 'expenses must be a list of objects'}), 400
+    
+    # Parse dates if provided
+    for update in updates:
+        if isinstance(update.get('date'), str):
+            update['date'] = parse_date(update['date'])
+    
+    return jsonify({'results': expense_repo.update_by_ids(updates)})
+
+# Route to delete many expenses by id
+@expense_bp.route('/batch-delete', methods=['POST'])
+def batch_delete_expenses():
+    ids, error = batch_items('ids')
+    if error:
+        return error
+    
+    return jsonify({'results': expense_repo.delete_by_ids(ids)})
+
 # Route to get all expenses for a user with filtering
 @expense_bp.route('/user/<user_id>', methods=['GET'])
 def get_user_expenses(user_id):
@@ -80,31 +253,102 @@ def get_user_expenses(user_id):
     # Parse category filter
     category_id = request.args.get('category_id', None)
     
-    # Get expenses with pagination and filtering
-    result = expense_repo.find_by_user(
-        user_id, skip, limit, sort_by, sort_dir, 
-        start_date, end_date, category_id
-    )
+    # Parse cursor from a previous page
+    after = request.args.get('after', None)
     
-    # Convert expenses to dict for JSON serialization
-    expenses_dict = []
-    for expense in result['expenses']:
-        expense_dict = expense.to_dict()
-        expense_dict['_id'] = str(expense_dict['_id'])
-        expense_dict['category_id'] = str(expense_dict['category_id'])
-        expense_dict['user_id'] = str(expense_dict['user_id'])
-        expense_dict['date'] = expense_dict['date'].isoformat()
-        expense_dict['created_at'] = expense_dict['created_at'].isoformat()
-        expense_dict['updated_at'] = expense_dict['updated_at'].isoformat()
-        expenses_dict.append(expense_dict)
+    # Parse count mode: exact, estimate or none
+    count = request.args.get('count', 'exact')
+    
+    # Parse expand=category to join category details
+    expand_category = wants_expand('category')
+    
+    # Get expenses with pagination and filtering
+    try:
+        result = expense_repo.find_by_user(
+            user_id, skip, limit, sort_by, sort_dir, 
+            start_date, end_date, category_id, after, count, expand_category, raw=True
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'expenses': expenses_dict,
+        'expenses': result['expenses'],
         'total': result['total'],
         'skip': result['skip'],
-        'limit': result['limit']
+        'limit': result['limit'],
+        'next_cursor': result['next_cursor']
     })
 
+# Columns included in expense exports
+EXPORT_FIELDS = ['_id', 'date', 'amount', 'description', 'category_id',
+                 'payment_method', 'created_at', 'updated_at']
+
+# Writer target that hands back each formatted CSV line instead of storing it
+class _CSVLine:
+    def write(self, value):
+        return value
+
+# Helper function to convert an exported document to JSON-compatible values
+def export_row(expense_data):
+    row = {}
+    for field in EXPORT_FIELDS:
+        value = expense_data.get(field)
+        if isinstance(value, ObjectId):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        row[field] = value
+    return row
+
+# Route to export all expenses for a user as CSV or NDJSON
+@expense_bp.route('/user/<user_id>/export', methods=['GET'])
+def export_user_expenses(user_id):
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    
+    # Parse date filters
+    start_date = parse_date(request.args.get('start_date', None))
+    end_date = parse_date(request.args.get('end_date', None))
+    
+    # Parse category filter
+    category_id = request.args.get('category_id', None)
+    
+    # Check the ids now, errors raised once the response has started can't be reported
+    if not ObjectId.is_valid(user_id):
+        return jsonify({'error': 'Invalid user id'}), 400
+    if category_id and not ObjectId.is_valid(category_id):
+        return jsonify({'error': 'Invalid category id'}), 400
+    
+    # Rows are read lazily while the response is being sent
+    expenses = expense_repo.iter_by_user(
+        user_id, start_date, end_date, category_id,
+        fields=EXPORT_FIELDS,
+        batch_size=current_app.config.get('EXPORT_BATCH_SIZE', 5000)
+    )
+    
+    def generate_csv():
+        writer = csv.writer(_CSVLine())
+        yield writer.writerow(EXPORT_FIELDS)
+        for expense_data in expenses:
+            row = export_row(expense_data)
+            yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+    
+    def generate_ndjson():
+        for expense_data in expenses:
+            yield dumps(expense_data) + b'\n'
+    
+    if export_format == 'csv':
+        body, mimetype = generate_csv(), 'text/csv'
+    else:
+        body, mimetype = generate_ndjson(), 'application/x-ndjson'
+    
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=expenses-{user_id}.{export_format}'}
+    )
+
 # Route to get a specific expense
 @expense_bp.route('/<expense_id>', methods=['GET'])
 def get_expense(expense_id):
@@ -112,12 +356,6 @@ def get_expense(expense_id):
     
     if expense:
         expense_dict = expense.to_dict()
-        expense_dict['_id'] = str(expense_dict['_id'])
-        expense_dict['category_id'] = str(expense_dict['category_id'])
-        expense_dict['user_id'] = str(expense_dict['user_id'])
-        expense_dict['date'] = expense_dict['date'].isoformat()
-        expense_dict['created_at'] = expense_dict['created_at'].isoformat()
-        expense_dict['updated_at'] = expense_dict['updated_at'].isoformat()
         
         return jsonify({'expense': expense_dict})
     
@@ -137,12 +375,6 @@ def update_expense(expense_id):
     
     if success:
         expense_dict = result.to_dict()
-        expense_dict['_id'] = str(expense_dict['_id'])
-        expense_dict['category_id'] = str(expense_dict['category_id'])
-        expense_dict['user_id'] = str(expense_dict['user_id'])
-        expense_dict['date'] = expense_dict['date'].isoformat()
-        expense_dict['created_at'] = expense_dict['created_at'].isoformat()
-        expense_dict['updated_at'] = expense_dict['updated_at'].isoformat()
         
         return jsonify({'expense': expense_dict, 'message': 'Expense updated successfully'})
     else:
@@ -160,22 +392,22 @@ def delete_expense(expense_id):
 
 # Route to get expense summary by category
 @expense_bp.route('/summary/category/<user_id>', methods=['GET'])
+@etag_by_data_version()
 def get_category_summary(user_id):
     # Parse date filters
     start_date = parse_date(request.args.get('start_date', None))
     end_date = parse_date(request.args.get('end_date', None))
     
-    # Get summary
-    result = expense_repo.get_summary_by_category(user_id, start_date, end_date)
-    
-    # Convert ObjectIds to strings
-    for item in result:
-        item['_id'] = str(item['_id'])
+    # Get summary, with category details when expand=category
+    result = expense_repo.get_summary_by_category(
+        user_id, start_date, end_date, wants_expand('category')
+    )
     
     return jsonify({'summary': result})
 
 # Route to get expense summary by month
 @expense_bp.route('/summary/month/<user_id>', methods=['GET'])
+@etag_by_data_version(lambda: datetime.utcnow().year)  # the default year
 def get_month_summary(user_id):
     # Parse year filter
     year = request.args.get('year', None)
@@ -189,6 +421,7 @@ def get_month_summary(user_id):
 
 # Route to get expense summary by payment method
 @expense_bp.route('/summary/payment-method/<user_id>', methods=['GET'])
+@etag_by_data_version()
 def get_payment_method_summary(user_id):
     # Parse date filters
     start_date = parse_date(request.args.get('start_date', None))
@@ -1,26 +1,36 @@
 # app/routes/UserRoutes.py
-from flask import Blueprint, request, jsonify, current_app
-from app.models.UserHandler import UserRepository
+from flask import Blueprint, request, current_app
+from app.serialization import jsonify
+from app.repositories import get_user_repository, get_category_handler
 from app.models.User import User
+from app.passwords import PasswordPoolBusy
 from bson.json_util import dumps
 import json
 
 # Create Blueprint
 user_bp = Blueprint('users', __name__, url_prefix='/api/users')
 
-# Create repository instance
+# Create repository instances
 user_repo = None
+category_repo = None
 
 def init_user_routes(app, mongo):
     """Initialize user routes with application context"""
-    global user_repo
-    # Initialize repository with the database connection
-    with app.app_context():
-        user_repo = UserRepository()
+    global user_repo, category_repo
+    # Use the repositories shared by all routes
+    user_repo = get_user_repository()
+    category_repo = get_category_handler()
     
     # Register the blueprint with the app
     app.register_blueprint(user_bp)
 
+# Answer requests that find the password hashing pool saturated with 503
+@user_bp.errorhandler(PasswordPoolBusy)
+def password_pool_busy(error):
+    response = jsonify({'error': 'Server busy, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 # Route to register a new user
 @user_bp.route('/register', methods=['POST'])
 def register():
@@ -32,14 +42,12 @@ def register():
         if field not in data or not data[field]:
             return jsonify({'error': f'{field} is required'}), 400
     
-    # Create the user
-    success, result = user_repo.create(data)
+    # Create the user with the default categories
+    success, result = user_repo.register(data, category_repo)
     
     if success:
         # Convert user to dict without private info
         user_dict = result.to_dict()
-        # Convert ObjectId to string for JSON serialization
-        user_dict['_id'] = str(user_dict['_id'])
         return jsonify({'user': user_dict, 'message': 'User registered successfully'}), 201
     else:
         # Return validation errors
@@ -65,7 +73,9 @@ def login():
     if user and user.check_password(data['password']):
         # Return user data without sensitive info
         user_dict = user.to_dict()
-        user_dict['_id'] = str(user_dict['_id'])
+        
+        # Move hashes made with outdated parameters to the current ones
+        user_repo.upgrade_password_hash(user, data['password'])
         
         # In a real app, you would generate a JWT token here
         return jsonify({
@@ -82,7 +92,6 @@ def get_user(user_id):
     
     if user:
         user_dict = user.to_dict()
-        user_dict['_id'] = str(user_dict['_id'])
         return jsonify({'user': user_dict})
     
     return jsonify({'error': 'User not found'}), 404
@@ -97,7 +106,6 @@ def update_user(user_id):
     
     if success:
         user_dict = result.to_dict()
-        user_dict['_id'] = str(user_dict['_id'])
         return jsonify({'user': user_dict, 'message': 'User updated successfully'})
     else:
         return jsonify({'errors': result}), 400
@@ -120,19 +128,16 @@ def list_users():
     limit = int(request.args.get('limit', 20))
     sort_by = request.args.get('sort_by', 'username')
     sort_dir = int(request.args.get('sort_dir', 1))  # 1 for ascending, -1 for descending
+    count = request.args.get('count', 'exact')  # exact, estimate or none
     
     # Get users with pagination
-    result = user_repo.list_all(skip, limit, sort_by, sort_dir)
-    
-    # Convert users to dict for JSON serialization
-    users_dict = []
-    for user in result['users']:
-        user_dict = user.to_dict()
-        user_dict['_id'] = str(user_dict['_id'])
-        users_dict.append(user_dict)
+    try:
+        result = user_repo.list_all(skip, limit, sort_by, sort_dir, count, raw=True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'users': users_dict,
+        'users': result['users'],
         'total': result['total'],
         'skip': result['skip'],
         'limit': result['limit']
@@ -0,0 +1,77 @@
+# app/serialization.py - JSON encoding of API responses
+import json
+from datetime import date, datetime
+from bson import ObjectId
+from flask import current_app
+from flask.json import JSONEncoder
+
+# orjson is in requirements.txt and used unless JSON_BACKEND says otherwise,
+# responses fall back to the json module when it can't be installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def default(obj):
+    """
+    Convert the BSON values found in documents to JSON-compatible values:
+    ObjectIds become strings and datetimes ISO 8601 strings
+    """
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+class MongoJSONEncoder(JSONEncoder):
+    """
+    Flask JSON encoder that understands ObjectId and datetime values,
+    used by anything still going through flask.jsonify
+    """
+
+    def default(self, obj):
+        if isinstance(obj, (ObjectId, datetime, date)):
+            return default(obj)
+        return super().default(obj)
+
+def use_orjson(app=None):
+    """Whether responses are encoded with orjson"""
+    backend = (app or current_app).config.get('JSON_BACKEND', 'auto')
+    if backend == 'orjson' and orjson is None:
+        raise RuntimeError('JSON_BACKEND is orjson but orjson is not installed')
+    return orjson is not None and backend in ('auto', 'orjson')
+
+def dumps(obj):
+    """
+    Encode obj as JSON bytes, handling ObjectId and datetime values natively
+    so documents can be passed straight from the database
+    """
+    if use_orjson():
+        return orjson.dumps(obj, default=default)
+    return json.dumps(obj, default=default, separators=(',', ':')).encode('utf-8')
+
+def jsonify(*args, **kwargs):
+    """
+    Drop-in replacement for flask.jsonify that encodes with dumps
+    """
+    if args and kwargs:
+        raise TypeError('jsonify() behavior undefined when passed both args and kwargs')
+    if len(args) == 1:
+        data = args[0]
+    else:
+        data = args or kwargs
+
+    return current_app.response_class(dumps(data) + b'\n', mimetype='application/json')
+
+def init_json(app):
+    """
+    Use the BSON-aware encoder for the app's own JSON handling, and log
+    which backend encodes the responses
+    """
+    app.json_encoder = MongoJSONEncoder
+
+    if use_orjson(app):
+        app.logger.info('Encoding JSON responses with orjson')
+    else:
+        # Several times slower per row, see benchmarks/bench_serialization.py
+        app.logger.warning('Encoding JSON responses with the json module, install orjson for faster responses')
@@ -0,0 +1,33 @@
+# asgi.py - ASGI entry point with the async API tier
+#
+#   uvicorn asgi:app --workers 4
+#
+# The dashboard, expense and category listings and the summaries are served
+# by the async routes in app/routes/AsyncRoutes.py, which await MongoDB
+# through PyMongo's AsyncMongoClient so one process can hold thousands of
+# requests in flight. Every other path is handed to the Flask app, run in a
+# thread pool like under a WSGI server.
+import contextlib
+import os
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from app.database import close_async_db, init_async_db
+from app.routes.AsyncRoutes import init_async_routes
+from main import create_app
+
+flask_app = create_app(os.getenv('FLASK_ENV', 'production'))
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # The async client belongs to the event loop it is created in
+    init_async_db(flask_app)
+    yield
+    await close_async_db()
+
+app = Starlette(
+    routes=init_async_routes(flask_app) + [
+        Mount('/', WSGIMiddleware(flask_app, workers=int(os.getenv('WSGI_THREADS', 10))))
+    ],
+    lifespan=lifespan
+)
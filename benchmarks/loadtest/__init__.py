@@ -0,0 +1,9 @@
+# benchmarks/loadtest - End-to-end load test of the API against a seeded MongoDB
+#
+#   python -m benchmarks.loadtest seed --users 20 --expenses 2000 --categories 12
+#   python -m benchmarks.loadtest run --duration 60 --concurrency 8 --output results.json
+#   python -m benchmarks.loadtest run --baseline baseline.json --fail-threshold 10
+#
+# `seed` writes the generated users to a manifest that `run` reads, so both
+# steps see the same data. Runs go through the Flask test client by default,
+# or against a running server with --url.
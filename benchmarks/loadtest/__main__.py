@@ -0,0 +1,89 @@
+# benchmarks/loadtest/__main__.py - Command line entry point
+import argparse
+import json
+import os
+import sys
+from benchmarks.loadtest.report import compare, format_comparison, read_report, regressions, write_report
+from benchmarks.loadtest.runner import HttpClient, TestClient, run
+from benchmarks.loadtest.scenarios import DEFAULT_MIX, parse_mix
+from benchmarks.loadtest.seed import read_manifest, reset, seed, write_manifest
+
+def make_app(config_name):
+    from main import create_app
+    return create_app(config_name)
+
+def seed_command(args):
+    app = make_app(args.config)
+    if args.reset:
+        print(f'Deleted {reset(app)} previously seeded users')
+    manifest = seed(app, args.users, args.expenses, args.categories, args.days, args.seed)
+    write_manifest(manifest, args.manifest)
+    total = sum(user['expenses'] for user in manifest['users'])
+    print(f"Seeded {len(manifest['users'])} users and {total} expenses, manifest in {args.manifest}")
+
+def run_command(args):
+    manifest = read_manifest(args.manifest)
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+
+    if args.url:
+        def make_client(samples):
+            return HttpClient(args.url, samples)
+    else:
+        app = make_app(args.config)
+
+        def make_client(samples):
+            return TestClient(app, samples)
+
+    report = run(make_client, manifest, mix, args.concurrency, args.duration, args.iterations,
+                 args.seed)
+    report['config']['target'] = args.url or 'in-process'
+
+    if args.output:
+        write_report(report, args.output)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        rows = compare(read_report(args.baseline), report)
+        print(format_comparison(rows), file=sys.stderr)
+        if args.fail_threshold is not None and regressions(rows, args.fail_threshold):
+            print(f'p95 regressed by more than {args.fail_threshold}%', file=sys.stderr)
+            return 1
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loadtest',
+                                     description='Seed synthetic data and load test the API.')
+    parser.add_argument('--config', default=os.getenv('FLASK_ENV', 'development'),
+                        help='App configuration to use (default: FLASK_ENV or development)')
+    parser.add_argument('--manifest', default='loadtest-manifest.json',
+                        help='File listing the seeded users')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help='Create users, categories and expenses')
+    seed_parser.add_argument('--users', type=int, default=10)
+    seed_parser.add_argument('--expenses', type=int, default=1000, help='Expenses per user')
+    seed_parser.add_argument('--categories', type=int, default=10, help='Categories per user')
+    seed_parser.add_argument('--days', type=int, default=365, help='Spread expenses over this many days before the seeding epoch')
+    seed_parser.add_argument('--reset', action='store_true',
+                             help='Delete the previously seeded users and their data first')
+    seed_parser.set_defaults(handler=seed_command)
+
+    run_parser = commands.add_parser('run', help='Replay the scenario mix and report latencies')
+    run_parser.add_argument('--url', help='Base URL of a running server, in-process if omitted')
+    run_parser.add_argument('--concurrency', type=int, default=4)
+    run_parser.add_argument('--duration', type=float, default=30, help='Seconds to run for')
+    run_parser.add_argument('--iterations', type=int, help='Scenarios per worker, overrides --duration')
+    run_parser.add_argument('--mix', help="Scenario weights, e.g. 'dashboard=50,paging=30,login=20'")
+    run_parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    run_parser.add_argument('--baseline', help='Report of a previous run to compare against')
+    run_parser.add_argument('--fail-threshold', type=float,
+                            help='Exit 1 if any p95 is this many percent slower than the baseline')
+    run_parser.set_defaults(handler=run_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args) or 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,43 @@
+# benchmarks/loadtest/report.py - Comparison of a run against a stored baseline
+import json
+
+# Statistics compared against the baseline, lower is better for all of them
+COMPARED = ('p50_ms', 'p95_ms', 'p99_ms')
+
+def compare(baseline, current):
+    """
+    Percentage change of each compared statistic, per section and label present in both
+    Returns a list of (section, label, statistic, baseline value, current value, change %)
+    """
+    rows = []
+    for section in ('scenarios', 'requests'):
+        for label, stats in current.get(section, {}).items():
+            base = baseline.get(section, {}).get(label)
+            if not base:
+                continue
+            for statistic in COMPARED:
+                before, after = base.get(statistic), stats.get(statistic)
+                if not before or after is None:
+                    continue
+                rows.append((section, label, statistic, before, after,
+                             round((after - before) / before * 100, 1)))
+    return rows
+
+def format_comparison(rows):
+    lines = [f"{'section':<10} {'label':<24} {'stat':<7} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for section, label, statistic, before, after, change in rows:
+        lines.append(f'{section:<10} {label:<24} {statistic:<7} {before:>10.2f} {after:>10.2f} '
+                     f'{change:>+7.1f}%')
+    return '\n'.join(lines)
+
+def regressions(rows, threshold, statistic='p95_ms'):
+    """Rows where the statistic got slower by more than threshold percent"""
+    return [row for row in rows if row[2] == statistic and row[5] > threshold]
+
+def read_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+def write_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
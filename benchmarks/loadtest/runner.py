@@ -0,0 +1,156 @@
+# benchmarks/loadtest/runner.py - Replays the scenario mix and collects latencies
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.loadtest.scenarios import SCENARIOS, pick
+
+class TestClient:
+    """Sends requests in-process through the Flask test client"""
+
+    def __init__(self, app, samples):
+        self.client = app.test_client()
+        self.samples = samples
+        self.failures = 0
+
+    def _send(self, label, method, path, body=None):
+        started_at = time.perf_counter()
+        response = self.client.open(path, method=method, json=body)
+        self.failures += not self.samples.record(label, time.perf_counter() - started_at,
+                                                 response.status_code)
+        return response.get_json(silent=True)
+
+    def get(self, label, path):
+        return self._send(label, 'GET', path)
+
+    def post(self, label, path, body):
+        return self._send(label, 'POST', path, body)
+
+class HttpClient:
+    """Sends requests to a running server"""
+
+    def __init__(self, base_url, samples, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.samples = samples
+        self.timeout = timeout
+        self.failures = 0
+
+    def _send(self, label, method, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'})
+        started_at = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            payload = e.read()
+            status = e.code
+        except OSError:
+            payload = b''
+            status = 0
+        self.failures += not self.samples.record(label, time.perf_counter() - started_at, status)
+
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+    def get(self, label, path):
+        return self._send(label, 'GET', path)
+
+    def post(self, label, path, body):
+        return self._send(label, 'POST', path, body)
+
+class Samples:
+    """Latencies and error counts per label, shared by all workers"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds, status):
+        """Store one sample, returns whether the status was a success"""
+        ok = 200 <= status < 400
+        with self._lock:
+            self.latencies.setdefault(label, []).append(seconds)
+            if not ok:
+                self.errors[label] = self.errors.get(label, 0) + 1
+        return ok
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+def summarize(samples, elapsed):
+    """Per-label count, error count, throughput and p50/p95/p99 in milliseconds"""
+    result = {}
+    for label, values in sorted(samples.latencies.items()):
+        values = sorted(values)
+        result[label] = {
+            'count': len(values),
+            'errors': samples.errors.get(label, 0),
+            'throughput_rps': round(len(values) / elapsed, 2) if elapsed else None,
+            'mean_ms': round(sum(values) / len(values) * 1000, 3),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+        }
+    return result
+
+def run(make_client, manifest, mix, concurrency=4, duration=30, iterations=None, seed_value=1):
+    """
+    Replay the scenario mix with `concurrency` workers for `duration` seconds,
+    or until each worker has run `iterations` scenarios.
+    Returns the report with per-scenario and per-request statistics.
+    """
+    # Scenarios date and filter their requests by the seeded period
+    users = [dict(user, password=manifest['password'], epoch=manifest.get('epoch'), days=manifest.get('days', 365))
+             for user in manifest['users']]
+    if not users:
+        raise ValueError('The manifest has no users, run the seed command first')
+
+    requests = Samples()
+    scenarios = Samples()
+    deadline = time.perf_counter() + duration
+
+    def worker(number):
+        rng = random.Random(seed_value * 1000 + number)
+        client = make_client(requests)
+        done = 0
+        while (iterations is None or done < iterations) and \
+                (iterations is not None or time.perf_counter() < deadline):
+            name = pick(mix, rng)
+            failures = client.failures
+            started_at = time.perf_counter()
+            SCENARIOS[name](client, rng.choice(users), rng)
+            status = 500 if client.failures > failures else 200
+            scenarios.record(name, time.perf_counter() - started_at, status)
+            done += 1
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker, n) for n in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started_at
+
+    return {
+        'config': {
+            'concurrency': concurrency,
+            'duration': duration,
+            'iterations': iterations,
+            'mix': mix,
+            'users': len(users),
+        },
+        'elapsed_s': round(elapsed, 3),
+        'scenarios': summarize(scenarios, elapsed),
+        'requests': summarize(requests, elapsed),
+    }
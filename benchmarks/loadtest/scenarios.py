@@ -0,0 +1,85 @@
+# benchmarks/loadtest/scenarios.py - The calls replayed against the API
+from datetime import datetime, timedelta
+
+# Page size used by the paging scenario and the legacy dashboard
+PAGE_SIZE = 50
+
+def epoch(user):
+    """End of the seeded period, the current time for manifests that don't record it"""
+    return datetime.fromisoformat(user['epoch']) if user.get('epoch') else datetime.utcnow()
+
+def seeded_year(user):
+    """Year of the most recent seeded expenses, which the monthly summaries are asked for"""
+    return (epoch(user) - timedelta(seconds=1)).year
+
+def dashboard(client, user, rng):
+    """Dashboard load through the single bundle endpoint"""
+    client.get('dashboard', f"/api/dashboard/{user['user_id']}?limit=100&year={seeded_year(user)}")
+
+def dashboard_legacy(client, user, rng):
+    """Dashboard load as the five separate fetches the page used to make"""
+    user_id = user['user_id']
+    client.get('categories', f'/api/categories/user/{user_id}')
+    client.get('expenses_page', f'/api/expenses/user/{user_id}?limit=100')
+    client.get('summary_category', f'/api/expenses/summary/category/{user_id}')
+    client.get('summary_month', f'/api/expenses/summary/month/{user_id}?year={seeded_year(user)}')
+    client.get('summary_payment_method', f'/api/expenses/summary/payment-method/{user_id}')
+
+def paging(client, user, rng, pages=5):
+    """Walk through the first pages of a user's expenses with the next_cursor"""
+    path = f"/api/expenses/user/{user['user_id']}?limit={PAGE_SIZE}&count=estimate"
+    after = None
+    for _ in range(pages):
+        body = client.get('expenses_page', path + (f'&after={after}' if after else ''))
+        after = body.get('next_cursor') if body else None
+        if not after:
+            break
+
+def create_expense(client, user, rng):
+    """Add one expense to a random category"""
+    client.post('expense_create', '/api/expenses', {
+        'amount': round(rng.uniform(1, 250), 2),
+        'description': 'load test expense',
+        'category_id': rng.choice(user['category_ids']),
+        'user_id': user['user_id'],
+        # Within the seeded period, so the data the other scenarios read keeps the same shape
+        'date': (epoch(user) - timedelta(seconds=rng.randrange(user.get('days', 365) * 86400))).isoformat(),
+        'payment_method': 'Credit Card'
+    })
+
+def login(client, user, rng):
+    """Log in with the seeded credentials"""
+    client.post('login', '/api/users/login', {'username': user['username'],
+                                              'password': user['password']})
+
+SCENARIOS = {
+    'dashboard': dashboard,
+    'dashboard_legacy': dashboard_legacy,
+    'paging': paging,
+    'create_expense': create_expense,
+    'login': login,
+}
+
+# Relative weight of each scenario in the default mix
+DEFAULT_MIX = {
+    'dashboard': 40,
+    'dashboard_legacy': 10,
+    'paging': 25,
+    'create_expense': 15,
+    'login': 10,
+}
+
+def parse_mix(text):
+    """Parse a mix like 'dashboard=50,login=10' into {scenario: weight}"""
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name}, expected one of: {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def pick(mix, rng):
+    """Choose a scenario name according to the mix weights"""
+    names = list(mix)
+    return rng.choices(names, weights=[mix[name] for name in names])[0]
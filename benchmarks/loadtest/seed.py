@@ -0,0 +1,118 @@
+# benchmarks/loadtest/seed.py - Synthetic data generator
+import json
+import random
+import re
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.database import get_db
+from app.models.CategoryHandler import DEFAULT_CATEGORIES
+from app.models.DataVersionHandler import DataVersionHandler
+from app.repositories import get_category_handler, get_expense_handler, get_user_repository
+
+# Password given to every seeded user, so the login scenario can use it
+PASSWORD = 'loadtest-password'
+
+PAYMENT_METHODS = ['Cash', 'Credit Card', 'Debit Card', 'Bank Transfer', 'Mobile Payment']
+WORDS = ['coffee', 'groceries', 'fuel', 'rent', 'lunch', 'taxi', 'books', 'cinema',
+         'pharmacy', 'gym', 'internet', 'phone', 'gift', 'dinner', 'parking']
+
+# Seeded data is dated relative to this, not to the time it is generated
+EPOCH = datetime(2024, 1, 1)
+
+def object_id(rng, when):
+    """ObjectId for a document dated when, its random part taken from rng"""
+    return ObjectId(int((when - datetime(1970, 1, 1)).total_seconds()).to_bytes(4, 'big') + rng.randbytes(8))
+
+def reset(app, prefix='loadtest'):
+    """
+    Delete the users seeded with prefix and everything they own, so seeding
+    again recreates the same data. Their data versions are bumped rather
+    than deleted, since cached summaries are keyed by them.
+    Returns the number of users deleted.
+    """
+    with app.app_context():
+        db = get_db().db
+        user_ids = db.users.distinct('_id', {'username': {'$regex': f'^{re.escape(prefix)}_'}})
+        if not user_ids:
+            return 0
+
+        query = {'user_id': {'$in': user_ids}}
+        for collection_name in ('expenses', 'categories', 'expense_rollups', 'category_usage'):
+            db[collection_name].delete_many(query)
+        db.users.delete_many({'_id': {'$in': user_ids}})
+        DataVersionHandler().bump(*user_ids)
+        get_category_handler().cache.clear()
+    return len(user_ids)
+
+def seed(app, users, expenses, categories, days=365, seed_value=1, prefix='loadtest', epoch=EPOCH):
+    """
+    Create users, each with `categories` categories and `expenses` expenses
+    spread over the `days` days before epoch, through the repository classes.
+    The same seed_value and epoch always generate the same documents, ids included.
+    Returns the manifest describing the seeded users.
+    """
+    rng = random.Random(seed_value)
+    manifest = {'created_at': datetime.utcnow().replace(microsecond=0).isoformat(),
+                'epoch': epoch.isoformat(), 'days': days, 'password': PASSWORD, 'users': []}
+
+    with app.app_context():
+        user_repo = get_user_repository()
+        category_repo = get_category_handler()
+        expense_repo = get_expense_handler()
+
+        for n in range(users):
+            username = f'{prefix}_{seed_value}_{n}'
+            success, user = user_repo.create({
+                '_id': object_id(rng, epoch),
+                'username': username,
+                'email': f'{username}@example.com',
+                'password': PASSWORD,
+                'created_at': epoch
+            })
+            if not success:
+                raise RuntimeError(f'Could not create {username}: {user}')
+
+            # Default categories first, then numbered ones up to the requested count
+            category_rows = [dict(category_data) for category_data in DEFAULT_CATEGORIES]
+            category_rows += [{'name': f'Category {i}'}
+                              for i in range(max(categories - len(DEFAULT_CATEGORIES), 0))]
+            category_ids = []
+            for category_data in category_rows:
+                success, category = category_repo.create(dict(category_data, _id=object_id(rng, epoch),
+                                                              user_id=user._id, created_at=epoch))
+                if not success:
+                    raise RuntimeError(f"Could not create {category_data['name']} for {username}: {category}")
+                category_ids.append(category._id)
+
+            def make_row(i):
+                date = epoch - timedelta(seconds=rng.randrange(days * 86400))
+                return {
+                    '_id': object_id(rng, date),
+                    'amount': round(rng.uniform(1, 250), 2),
+                    'description': f'{rng.choice(WORDS)} {i}',
+                    'category_id': rng.choice(category_ids),
+                    'user_id': user._id,
+                    'date': date,
+                    'payment_method': rng.choice(PAYMENT_METHODS),
+                    'created_at': date,
+                    'updated_at': date
+                }
+
+            result = expense_repo.create_many(make_row(i) for i in range(expenses))
+
+            manifest['users'].append({
+                'user_id': str(user._id),
+                'username': username,
+                'category_ids': [str(category_id) for category_id in category_ids],
+                'expenses': result['inserted']
+            })
+
+    return manifest
+
+def write_manifest(manifest, path):
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+def read_manifest(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,29 @@
+# benchmarks/micro/bench_models.py - Model construction, conversion and validation
+from app.models.Category import Category
+from app.models.Expense import Expense
+from app.models.User import User
+
+def bench_expense_from_dict(benchmark, expense_json):
+    # from_dict converts in place, so each run works on copies
+    benchmark(lambda: [Expense.from_dict(dict(data)) for data in expense_json])
+
+def bench_expense_from_bson(benchmark, expense_documents):
+    benchmark(lambda: [Expense.from_bson(data) for data in expense_documents])
+
+def bench_expense_to_dict(benchmark, expense_documents):
+    expenses = [Expense.from_bson(data) for data in expense_documents]
+    benchmark(lambda: [expense.to_dict() for expense in expenses])
+
+def bench_expense_validate(benchmark, expense_json):
+    benchmark(lambda: [Expense.validate(data) for data in expense_json])
+
+def bench_category_from_dict(benchmark, category_documents):
+    benchmark(lambda: [Category.from_dict(dict(data)) for data in category_documents])
+
+def bench_category_from_bson(benchmark, category_documents):
+    benchmark(lambda: [Category.from_bson(data) for data in category_documents])
+
+def bench_user_validate(benchmark, rows):
+    users = [{'username': f'user_{i}', 'email': f'user_{i}@example.com', 'password': 'secret-password'}
+             for i in range(rows)]
+    benchmark(lambda: [User.validate(data) for data in users])
@@ -0,0 +1,25 @@
+# benchmarks/micro/bench_responses.py - Encoding of list pages as the routes do it
+from app.models.Category import Category
+from app.models.Expense import Expense
+from app.serialization import jsonify
+
+def bench_expense_page_raw(benchmark, request_context, expense_documents):
+    # get_user_expenses: raw documents straight into the response
+    benchmark(lambda: jsonify({'expenses': expense_documents, 'total': len(expense_documents)}))
+
+def bench_expense_page_models(benchmark, request_context, expense_documents):
+    # Routes that go through the models, like get_expense
+    def page():
+        expenses = [Expense.from_bson(data) for data in expense_documents]
+        return jsonify({'expenses': [expense.to_dict() for expense in expenses]})
+    benchmark(page)
+
+def bench_category_page_raw(benchmark, request_context, category_documents):
+    # get_user_categories: copies of the cached documents into the response
+    benchmark(lambda: jsonify({'categories': [dict(data) for data in category_documents]}))
+
+def bench_category_page_models(benchmark, request_context, category_documents):
+    def page():
+        categories = [Category.from_bson(data) for data in category_documents]
+        return jsonify({'categories': [category.to_dict() for category in categories]})
+    benchmark(page)
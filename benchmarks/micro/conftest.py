@@ -0,0 +1,97 @@
+# benchmarks/micro - Micro-benchmarks of the model and serialization hot paths
+#
+# Run without a database, pytest-benchmark is required:
+#
+#   pip install pytest-benchmark
+#   pytest benchmarks/micro --benchmark-save=baseline
+#   pytest benchmarks/micro --benchmark-compare
+#
+# When comparing, the run fails if any benchmark's mean is more than
+# MICRO_BENCH_THRESHOLD percent (default 10) slower than the saved run.
+# Pass --benchmark-compare-fail to use a different check.
+import os
+import sys
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from app.serialization import init_json
+
+# Page sizes every list benchmark runs at
+PAGE_SIZES = [50, 1000, 10000]
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    """Fail on regressions past the threshold whenever a comparison is requested"""
+    if not config.pluginmanager.hasplugin('benchmark'):
+        return
+    from pytest_benchmark.utils import parse_compare_fail
+
+    if config.getoption('benchmark_compare', None) and not config.getoption('benchmark_compare_fail', None):
+        threshold = os.getenv('MICRO_BENCH_THRESHOLD', '10')
+        config.option.benchmark_compare_fail = [parse_compare_fail(f'mean:{threshold}%')]
+
+@pytest.fixture(params=PAGE_SIZES, ids=lambda rows: f'{rows}rows')
+def rows(request):
+    return request.param
+
+@pytest.fixture
+def expense_documents(rows):
+    """Expense documents shaped like the ones PyMongo returns"""
+    user_id = ObjectId()
+    categories = [ObjectId() for _ in range(10)]
+    now = datetime(2024, 6, 1, 12, 0)
+    return [
+        {
+            '_id': ObjectId(),
+            'amount': float(i % 500) + 0.99,
+            'description': f'Expense {i}',
+            'category_id': categories[i % 10],
+            'user_id': user_id,
+            'date': now - timedelta(hours=i),
+            'payment_method': 'Card',
+            'created_at': now,
+            'updated_at': now
+        }
+        for i in range(rows)
+    ]
+
+@pytest.fixture
+def expense_json(expense_documents):
+    """The same expenses as they arrive in a request body, with string ids and dates"""
+    return [
+        {key: str(value) if isinstance(value, ObjectId) else
+         value.isoformat() if isinstance(value, datetime) else value
+         for key, value in document.items()}
+        for document in expense_documents
+    ]
+
+@pytest.fixture
+def category_documents(rows):
+    """Category documents shaped like the ones PyMongo returns"""
+    user_id = ObjectId()
+    now = datetime(2024, 6, 1, 12, 0)
+    return [
+        {
+            '_id': ObjectId(),
+            'name': f'Category {i}',
+            'description': 'Benchmark category',
+            'color': '#3498DB',
+            'icon': 'category',
+            'user_id': user_id,
+            'created_at': now
+        }
+        for i in range(rows)
+    ]
+
+@pytest.fixture
+def request_context():
+    """A request context of an app set up like the real one, without a database"""
+    app = Flask(__name__)
+    app.config['JSON_BACKEND'] = os.getenv('JSON_BACKEND', 'auto')
+    init_json(app)
+    with app.test_request_context():
+        yield app
@@ -16,22 +16,96 @@ class Config:
     elif 'mongodb+srv://' in MONGO_URI and '/' not in MONGO_URI.split('@')[1]:
         MONGO_URI += '/ExpenseAppDB'
     
-    # MongoDB connection settings
+    # MongoDB connection settings, passed to MongoClient by app.database.client_options.
+    # The pool limits are per worker process, see gunicorn.conf.py for sizing.
     MONGO_CONNECT = True
-    MONGO_MAXPOOLSIZE = 50
-    MONGO_MINPOOLSIZE = 10
+    MONGO_MAXPOOLSIZE = int(os.getenv('MONGO_MAXPOOLSIZE', 50))
+    MONGO_MINPOOLSIZE = int(os.getenv('MONGO_MINPOOLSIZE', 10))
     MONGO_MAX_IDLE_TIME_MS = 10000
     MONGO_RETRYREADS = True
     MONGO_RETRYWRITES = True
+    
+    # Fail fast instead of hanging when the pool is exhausted or the server is unreachable
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    MONGO_CONNECT_TIMEOUT_MS = 5000
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 30000))
+    
+    # Cached totals used by list endpoints called with count=estimate
+    COUNT_CACHE_TTL = 60
+    COUNT_CACHE_SIZE = 10000
+    
+    # Serve month-aligned summaries from the expense_rollups collection.
+    # The rollups are always kept up to date, but on existing data run
+    # `flask rollups rebuild` once before enabling them.
+    USE_EXPENSE_ROLLUPS = os.getenv('USE_EXPENSE_ROLLUPS', 'false').lower() == 'true'
+    
+    # Number of rows written per insert_many by the bulk import
+    BULK_INSERT_CHUNK_SIZE = 1000
+    
+    # Most expenses a batch-get, batch update or batch-delete request may list
+    MAX_BATCH_IDS = 5000
+    
+    # Most recent expenses the dashboard returns, keeping its single $facet result under 16 MB
+    MAX_DASHBOARD_EXPENSES = 1000
+    
+    # Number of documents fetched per cursor batch by the expense export
+    EXPORT_BATCH_SIZE = 5000
+    
+    # Per-process cache of category lookups, cleared on every category write
+    CATEGORY_CACHE_SIZE = 1024
+    CATEGORY_CACHE_TTL = 300
+    
+    # Cache of summary aggregation results: memory (per worker), filesystem
+    # (shared by the workers on a host), redis (shared by all hosts) or none.
+    # Entries are keyed by the user's data version so writes never serve stale results.
+    SUMMARY_CACHE_BACKEND = os.getenv('SUMMARY_CACHE_BACKEND', 'memory')
+    SUMMARY_CACHE_TTL = 300
+    SUMMARY_CACHE_SIZE = 1024
+    SUMMARY_CACHE_DIR = os.getenv('SUMMARY_CACHE_DIR')
+    SUMMARY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    SUMMARY_CACHE_REDIS_URL = os.getenv('SUMMARY_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    
+    # JSON encoder for API responses: auto (orjson when installed), orjson or json
+    JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto')
+    
+    # Index handling at startup: ensure (create missing), check (log missing) or off.
+    # Production deploys run `flask db ensure-indexes` instead of creating them on boot.
+    MONGO_INDEX_MODE = os.getenv('MONGO_INDEX_MODE', 'check')
+    
+    # Insert a new user and their default categories in one transaction
+    # (needs a replica set), otherwise a user can end up without the defaults
+    ONBOARDING_TRANSACTION = os.getenv('ONBOARDING_TRANSACTION', 'false').lower() == 'true'
+    
+    # Password hashing runs in a pool of PASSWORD_HASH_WORKERS processes per
+    # worker (0 hashes in the request thread). Once PASSWORD_HASH_MAX_PENDING
+    # hashes are queued or running, further logins and registrations get a 503.
+    # Hashes made with another PASSWORD_HASH_METHOD are upgraded on login.
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:260000')
+    PASSWORD_SALT_LENGTH = 16
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 32))
+    PASSWORD_HASH_TIMEOUT = 5
+    
+    # Add Server-Timing headers with per-request database time to every response
+    SERVER_TIMING = True
+    # Log requests issuing more MongoDB commands than this, a hint of queries in a loop
+    DB_COMMANDS_WARN_THRESHOLD = 25
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    MONGO_INDEX_MODE = os.getenv('MONGO_INDEX_MODE', 'ensure')
 
 class ProductionConfig(Config):
     DEBUG = False
+    SUMMARY_CACHE_BACKEND = os.getenv('SUMMARY_CACHE_BACKEND', 'filesystem')
 
 class TestingConfig(Config):
     TESTING = True
+    # Test databases start empty, so the rollups are complete from the first write
+    USE_EXPENSE_ROLLUPS = os.getenv('USE_EXPENSE_ROLLUPS', 'true').lower() == 'true'
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0))
+    MONGO_INDEX_MODE = os.getenv('MONGO_INDEX_MODE', 'ensure')
     MONGO_URI = os.getenv('TEST_MONGO_URI', 'mongodb://localhost:27017/ExpenseAppDB_test')
 
 config = {
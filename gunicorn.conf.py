@@ -0,0 +1,58 @@
+# gunicorn.conf.py - Production server settings, used with `gunicorn -c gunicorn.conf.py wsgi:app`
+#
+# Sizing
+# ------
+# Each worker is a process with its own MongoClient, and each of its
+# threads handles one request at a time, holding at most one pooled
+# connection while it talks to MongoDB. So:
+#
+#   threads per worker       <= MONGO_MAXPOOLSIZE
+#   connections per host     ~= workers * (MONGO_MAXPOOLSIZE + 2 monitor connections per server)
+#
+# Keep threads at or below MONGO_MAXPOOLSIZE (50 by default) so requests
+# never queue on the pool, and keep workers * MONGO_MAXPOOLSIZE * hosts
+# well below the server's connection limit (net.maxIncomingConnections,
+# or the tier limit on Atlas). A worker per core with 4-8 threads suits
+# this I/O-bound app; raise threads rather than workers when the CPU is
+# idle waiting on MongoDB, since threads share the process' memory and pool.
+#
+# Each worker also starts PASSWORD_HASH_WORKERS hashing processes on its
+# first login or registration, so leave that many cores per worker free
+# of other work if logins come in bursts.
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Load the app once in the master so workers share its memory copy-on-write
+preload_app = True
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth, staggered so they don't restart together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+def pre_fork(server, worker):
+    # MongoClient isn't fork-safe, close the master's connections before forking
+    from app.database import close_db
+    close_db()
+
+def post_fork(server, worker):
+    # Give each worker a client of its own
+    from app.database import reconnect_db
+    reconnect_db(server.app.wsgi())
+    server.log.info('Worker %s created its MongoDB client', worker.pid)
+
+def worker_exit(server, worker):
+    # Stop the worker's password hashing processes, see PASSWORD_HASH_WORKERS
+    from app.passwords import shutdown_pool
+    shutdown_pool()
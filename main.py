@@ -8,6 +8,12 @@ from app.routes.DashboardRoutes import init_dashboard_routes
 from app.routes.AuthRoutes import init_auth_routes
 from app.routes.ExpenseFormRoutes import init_expense_form_routes
 from app.database import init_db
+from app.indexes import init_indexes
+from app.repositories import init_repositories
+from app.monitoring import init_monitoring
+from app.serialization import init_json
+from app.passwords import init_passwords
+from app.commands import register_commands
 from config import config
 import os
 
@@ -24,6 +30,21 @@ def create_app(config_name='default'):
     # Initialize database
     mongo = init_db(app)
     
+    # Create or check the registered indexes
+    init_indexes(app, mongo.db)
+    
+    # Create the repositories shared by all routes
+    init_repositories(app)
+    
+    # Time requests and their database commands, expose them on /metrics
+    init_monitoring(app)
+    
+    # Encode ObjectId and datetime values in JSON responses
+    init_json(app)
+    
+    # Hash passwords in a process pool with the configured parameters
+    init_passwords(app)
+    
     # Register all routes
     register_routes(app, mongo)
 
@@ -37,7 +58,7 @@ def create_app(config_name='default'):
     init_category_routes(app, mongo)
     
     # Register dashboard routes
-    init_dashboard_routes(app)
+    init_dashboard_routes(app, mongo)
     
     # Register authentication routes
     init_auth_routes(app)
@@ -45,6 +66,9 @@ def create_app(config_name='default'):
     # Register expense form routes
     init_expense_form_routes(app)
     
+    # Register CLI commands
+    register_commands(app)
+    
     return app
 
 if __name__ == '__main__':
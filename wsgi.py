@@ -0,0 +1,11 @@
+# wsgi.py - Production WSGI entry point
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# The app is created once in the gunicorn master (preload_app) and shared by
+# the workers copy-on-write; gunicorn.conf.py gives each worker its own
+# MongoDB client after fork.
+import os
+from main import create_app
+
+app = create_app(os.getenv('FLASK_ENV', 'production'))